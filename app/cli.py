@@ -0,0 +1,150 @@
+"""
+Command-line entry points.
+
+    python -m app.cli sync [--numbers FILE] [--no-resume]
+    python -m app.cli backfill-phones [--batch-size N]
+    python -m app.cli serve [--host HOST] [--port PORT] [--workers N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import threading
+
+from app.config import settings
+from app.db import Base, engine
+from app.migrations import backfill_phone_e164, prepare_database
+from app.services import crm as crm_svc
+from app.services import sync
+
+
+async def _sync(args: argparse.Namespace) -> None:
+    await prepare_database(engine)
+    await crm_svc.startup()
+    try:
+        stats = await sync.run(numbers_file=args.numbers, resume=not args.no_resume)
+    finally:
+        await crm_svc.shutdown()
+        await engine.dispose()
+    print(
+        f"synced {stats.fetched} numbers: {stats.upserted} upserted, "
+        f"{stats.missing} not in CRM ({stats.rows_per_second:.1f} rows/s)"
+    )
+    if stats.failed:
+        print(f"stopped: {stats.failed} lookups still failing; rerun to resume")
+
+
+async def _backfill_phones(args: argparse.Namespace) -> None:
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            report = await conn.run_sync(backfill_phone_e164, args.batch_size)
+    finally:
+        await engine.dispose()
+    for e164, kept, unkeyed in report.duplicates:
+        print(f"duplicate {e164}: kept customer {kept}, left customer {unkeyed} unkeyed")
+    print(f"keyed {report.keyed} customers, {len(report.duplicates)} duplicates")
+
+
+def _share_call_state(workers: int) -> None:
+    # A call's webhooks reach any worker, so its session and conversation
+    # memory must live in the SQLite store every worker on the host opens.
+    if workers <= 1:
+        return
+    if settings.speculative_replies_enabled:
+        # Speculations live in the worker that got /voice/partial and would
+        # rarely be the one /voice/handle reaches: every one would be wasted.
+        os.environ["SPECULATIVE_REPLIES_ENABLED"] = "false"
+        logging.getLogger(__name__).warning(
+            "SPECULATIVE_REPLIES_ENABLED needs a single worker; disabled for %d workers", workers
+        )
+    if settings.call_session_backend != "memory":
+        return
+    if "call_session_backend" in settings.model_fields_set:
+        raise SystemExit(
+            f"CALL_SESSION_BACKEND=memory keeps call sessions and conversation history per worker; "
+            f"with {workers} workers a call's turns would lose them. Use CALL_SESSION_BACKEND=sqlite or --workers 1."
+        )
+    os.environ["CALL_SESSION_BACKEND"] = "sqlite"
+    logging.getLogger(__name__).info(
+        "%d workers: call sessions and conversation history use the SQLite store at %s",
+        workers, settings.call_session_path,
+    )
+
+
+def _serve(args: argparse.Namespace) -> None:
+    import uvicorn
+
+    async def prepare() -> None:
+        try:
+            await prepare_database(engine)
+        finally:
+            await engine.dispose()
+
+    async def sync_listing() -> None:
+        await crm_svc.startup()
+        try:
+            await sync.run_logged()
+        finally:
+            await crm_svc.shutdown()
+            await engine.dispose()
+
+    # Once, here, rather than racing in every worker.
+    asyncio.run(prepare())
+    if settings.crm_sync_on_startup and args.workers > 1:
+        # One sync for the host, from this supervising process, rather than
+        # one per worker against the same checkpoint. A single worker runs
+        # in this process and does it from its own startup.
+        os.environ["CRM_SYNC_ON_STARTUP"] = "false"
+        threading.Thread(target=asyncio.run, args=(sync_listing(),), name="crm-sync", daemon=True).start()
+    # Workers are fresh interpreters that read their settings from the
+    # environment: skip the schema step and warm up before accepting requests.
+    os.environ["DB_SCHEMA_ON_STARTUP"] = "false"
+    os.environ["WARMUP_BEFORE_SERVING"] = "true"
+    settings.db_schema_on_startup = False  # a single worker runs in this process
+    settings.warmup_before_serving = True
+    _share_call_state(args.workers)
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sync_cmd = commands.add_parser("sync", help="Warm the local profile DB from the CRM")
+    sync_cmd.add_argument("--numbers", help="File with one phone number per line (default: CRM_LIST_URL listing)")
+    sync_cmd.add_argument("--no-resume", action="store_true", help="Ignore any saved checkpoint")
+    sync_cmd.set_defaults(handler=_sync)
+
+    backfill_cmd = commands.add_parser(
+        "backfill-phones",
+        help="Add and fill the normalized phone_e164 key for existing customers",
+    )
+    backfill_cmd.add_argument("--batch-size", type=int, default=1000)
+    backfill_cmd.set_defaults(handler=_backfill_phones)
+
+    serve_cmd = commands.add_parser("serve", help="Serve the app with N pre-warmed uvicorn workers")
+    serve_cmd.add_argument("--host", default="0.0.0.0")
+    serve_cmd.add_argument("--port", type=int, default=8000)
+    serve_cmd.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    serve_cmd.add_argument("--log-level", default="info")
+    serve_cmd.set_defaults(handler=_serve)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    result = args.handler(args)
+    if asyncio.iscoroutine(result):
+        asyncio.run(result)
+
+
+if __name__ == "__main__":
+    main()
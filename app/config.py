@@ -5,17 +5,159 @@ from pydantic import Field
 class Settings(BaseSettings):
     app_env: str = Field(default="dev", alias="APP_ENV")
     database_url: str = Field(default="sqlite+aiosqlite:///./data/app.db", alias="DATABASE_URL")
+    database_replica_url: str | None = Field(default=None, alias="DATABASE_REPLICA_URL")
+
+    # Engine profile: pool sizing (PostgreSQL and file-backed SQLite)
+    db_pool_size: int = Field(default=10, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=20, alias="DB_MAX_OVERFLOW")
+    db_pool_timeout_seconds: float = Field(default=10.0, alias="DB_POOL_TIMEOUT_SECONDS")
+    db_pool_recycle_seconds: int = Field(default=1800, alias="DB_POOL_RECYCLE_SECONDS")
+    db_statement_cache_size: int = Field(default=500, alias="DB_STATEMENT_CACHE_SIZE")  # asyncpg
+
+    # Engine profile: SQLite PRAGMAs applied on every new connection
+    sqlite_journal_mode: str = Field(default="WAL", alias="SQLITE_JOURNAL_MODE")
+    sqlite_synchronous: str = Field(default="NORMAL", alias="SQLITE_SYNCHRONOUS")
+    sqlite_mmap_size: int = Field(default=268435456, alias="SQLITE_MMAP_SIZE")
+    sqlite_busy_timeout_ms: int = Field(default=5000, alias="SQLITE_BUSY_TIMEOUT_MS")
+    sqlite_cache_size: int = Field(default=-65536, alias="SQLITE_CACHE_SIZE")  # negative = KiB
+
+    # Startup: with DB_SCHEMA_ON_STARTUP every worker creates tables and runs
+    # migrations as it starts (`python -m app.cli serve` does this once before
+    # starting workers and turns it off). Warm-up (language model, LLM client,
+    # TwiML, profiles of the WARMUP_HOT_PROFILES most recent callers) runs in
+    # the background while /healthz answers 503; with WARMUP_BEFORE_SERVING
+    # startup waits for it, so the worker only accepts requests once warm
+    db_schema_on_startup: bool = Field(default=True, alias="DB_SCHEMA_ON_STARTUP")
+    warmup_before_serving: bool = Field(default=False, alias="WARMUP_BEFORE_SERVING")
+    warmup_hot_profiles: int = Field(default=1000, alias="WARMUP_HOT_PROFILES")
 
     # Twilio
     twilio_auth_token: str | None = Field(default=None, alias="TWILIO_AUTH_TOKEN")
 
     # AI providers (optional)
     openai_api_key: str | None = Field(default=None, alias="OPENAI_API_KEY")
+    llm_reply_budget_seconds: float = Field(default=4.0, alias="LLM_REPLY_BUDGET_SECONDS")
+    # Admission control: concurrent LLM calls per worker; further turns queue
+    # for at most LLM_QUEUE_WAIT_SECONDS (counted against the reply budget),
+    # LLM_MAX_QUEUE at a time, then get the template reply
+    llm_max_in_flight: int = Field(default=32, alias="LLM_MAX_IN_FLIGHT")
+    llm_queue_wait_seconds: float = Field(default=1.0, alias="LLM_QUEUE_WAIT_SECONDS")
+    llm_max_queue: int = Field(default=256, alias="LLM_MAX_QUEUE")
+    # Speculative replies: <Gather> posts partial transcripts to /voice/partial
+    # and the reply is generated once the transcript has been stable for
+    # SPECULATION_STABLE_MS, for /voice/handle to reuse. Each wrong guess costs
+    # an LLM call (speculative_llm_calls_wasted_total)
+    speculative_replies_enabled: bool = Field(default=False, alias="SPECULATIVE_REPLIES_ENABLED")
+    speculation_stable_ms: int = Field(default=300, alias="SPECULATION_STABLE_MS")
+
+    # LLM reply cache
+    reply_cache_enabled: bool = Field(default=True, alias="REPLY_CACHE_ENABLED")
+    reply_cache_size: int = Field(default=5000, alias="REPLY_CACHE_SIZE")
+    reply_cache_ttl_seconds: float = Field(default=3600.0, alias="REPLY_CACHE_TTL_SECONDS")
+    reply_cache_path: str | None = Field(default=None, alias="REPLY_CACHE_PATH")
+    reply_cache_persistent_size: int = Field(default=100000, alias="REPLY_CACHE_PERSISTENT_SIZE")
+    reply_cache_persistent_ttl_seconds: float = Field(default=86400.0, alias="REPLY_CACHE_PERSISTENT_TTL_SECONDS")
 
     # CRM integration
     crm_api_base_url: str | None = Field(default=None, alias="CRM_API_BASE_URL")
     crm_api_token: str | None = Field(default=None, alias="CRM_API_TOKEN")
     crm_timeout_seconds: float = Field(default=3.0, alias="CRM_TIMEOUT_SECONDS")
+    crm_max_connections: int = Field(default=100, alias="CRM_MAX_CONNECTIONS")
+    crm_max_keepalive_connections: int = Field(default=20, alias="CRM_MAX_KEEPALIVE_CONNECTIONS")
+    crm_keepalive_expiry_seconds: float = Field(default=30.0, alias="CRM_KEEPALIVE_EXPIRY_SECONDS")
+    crm_http2: bool = Field(default=False, alias="CRM_HTTP2")
+    crm_max_in_flight: int = Field(default=50, alias="CRM_MAX_IN_FLIGHT")
+    # Lookups beyond CRM_MAX_IN_FLIGHT queue for at most CRM_QUEUE_WAIT_SECONDS
+    # (CRM_MAX_QUEUE at a time); shed lookups proceed with default personalization
+    crm_queue_wait_seconds: float = Field(default=0.5, alias="CRM_QUEUE_WAIT_SECONDS")
+    crm_max_queue: int = Field(default=500, alias="CRM_MAX_QUEUE")
+    crm_negative_ttl_seconds: float = Field(default=300.0, alias="CRM_NEGATIVE_TTL_SECONDS")
+    crm_negative_cache_size: int = Field(default=10000, alias="CRM_NEGATIVE_CACHE_SIZE")
+    crm_breaker_failure_threshold: int = Field(default=5, alias="CRM_BREAKER_FAILURE_THRESHOLD")
+    crm_breaker_cooldown_seconds: float = Field(default=30.0, alias="CRM_BREAKER_COOLDOWN_SECONDS")
+
+    # CRM -> local DB warm sync
+    crm_list_url: str | None = Field(default=None, alias="CRM_LIST_URL")
+    crm_sync_page_size: int = Field(default=500, alias="CRM_SYNC_PAGE_SIZE")
+    crm_sync_concurrency: int = Field(default=20, alias="CRM_SYNC_CONCURRENCY")
+    crm_sync_checkpoint_path: str = Field(default="data/crm_sync.json", alias="CRM_SYNC_CHECKPOINT_PATH")
+    # Lookups that fail (CRM down, 5xx) are retried this many times before the
+    # run stops, leaving the checkpoint on their page for the next run.
+    crm_sync_max_attempts: int = Field(default=5, alias="CRM_SYNC_MAX_ATTEMPTS")
+    crm_sync_on_startup: bool = Field(default=False, alias="CRM_SYNC_ON_STARTUP")
+
+    # In-process caller profile cache
+    profile_cache_size: int = Field(default=10000, alias="PROFILE_CACHE_SIZE")
+    profile_cache_ttl_seconds: float = Field(default=300.0, alias="PROFILE_CACHE_TTL_SECONDS")
+    profile_cache_negative_ttl_seconds: float = Field(default=30.0, alias="PROFILE_CACHE_NEGATIVE_TTL_SECONDS")
+
+    # Batch profile lookup
+    profile_lookup_chunk_size: int = Field(default=500, alias="PROFILE_LOOKUP_CHUNK_SIZE")
+    profile_lookup_crm_concurrency: int = Field(default=10, alias="PROFILE_LOOKUP_CRM_CONCURRENCY")
+
+    # Bulk profile import/export
+    bulk_batch_size: int = Field(default=1000, alias="BULK_BATCH_SIZE")
+    bulk_max_reported_errors: int = Field(default=1000, alias="BULK_MAX_REPORTED_ERRORS")
+
+    # Per-call session state (keyed by Twilio CallSid)
+    call_session_backend: str = Field(default="memory", alias="CALL_SESSION_BACKEND")  # memory | sqlite
+    call_session_path: str = Field(default="data/sessions.db", alias="CALL_SESSION_PATH")
+    call_session_ttl_seconds: float = Field(default=3600.0, alias="CALL_SESSION_TTL_SECONDS")
+    call_session_max: int = Field(default=10000, alias="CALL_SESSION_MAX")
+
+    # Conversation memory: each call's last CONVERSATION_TURNS turns go into
+    # the next prompt and /voice/handle answers with another <Gather> to keep
+    # the call going (0: reply once, then hang up). Calls idle for
+    # CONVERSATION_TTL_SECONDS are forgotten. Prompts are held to roughly
+    # LLM_PROMPT_TOKEN_BUDGET tokens by summarizing the oldest turns
+    conversation_turns: int = Field(default=6, alias="CONVERSATION_TURNS")
+    conversation_ttl_seconds: float = Field(default=900.0, alias="CONVERSATION_TTL_SECONDS")
+    conversation_max: int = Field(default=10000, alias="CONVERSATION_MAX")
+    llm_prompt_token_budget: int = Field(default=600, alias="LLM_PROMPT_TOKEN_BUDGET")
+
+    # Language detection: candidate languages for the statistical model, and
+    # utterances up to this length are memoized
+    langid_languages: str = Field(default="en,hi,mr", alias="LANGID_LANGUAGES")
+    langid_memo_max_chars: int = Field(default=64, alias="LANGID_MEMO_MAX_CHARS")
+
+    # TTS: "none" keeps Twilio <Say>; "openai" or "stub" synthesize audio into
+    # a content-addressed cache served at /tts/ and played with <Play>.
+    # PUBLIC_BASE_URL prefixes audio URLs (empty: relative to the webhook URL)
+    tts_provider: str = Field(default="none", alias="TTS_PROVIDER")
+    tts_openai_model: str = Field(default="tts-1", alias="TTS_OPENAI_MODEL")
+    tts_cache_dir: str = Field(default="data/tts", alias="TTS_CACHE_DIR")
+    tts_max_in_flight: int = Field(default=4, alias="TTS_MAX_IN_FLIGHT")
+    tts_queue_wait_seconds: float = Field(default=0.5, alias="TTS_QUEUE_WAIT_SECONDS")
+    tts_max_queue: int = Field(default=64, alias="TTS_MAX_QUEUE")
+    tts_timeout_seconds: float = Field(default=3.0, alias="TTS_TIMEOUT_SECONDS")
+    public_base_url: str = Field(default="", alias="PUBLIC_BASE_URL")
+
+    # Media Streams: with MEDIA_STREAMS_ENABLED (plus an ASR_PROVIDER and a
+    # TTS_PROVIDER), /voice/incoming connects the call to the /voice/stream
+    # WebSocket, which recognizes speech, replies and streams audio back
+    # without a webhook round trip per turn. Queues are sized in 20 ms frames;
+    # STREAM_PLAYBACK_LEAD_MS caps how far reply audio runs ahead of playback,
+    # which bounds what a barge-in has to throw away
+    media_streams_enabled: bool = Field(default=False, alias="MEDIA_STREAMS_ENABLED")
+    asr_provider: str = Field(default="none", alias="ASR_PROVIDER")  # none | stub
+    asr_silence_ms: int = Field(default=500, alias="ASR_SILENCE_MS")
+    asr_energy_threshold: float = Field(default=500.0, alias="ASR_ENERGY_THRESHOLD")
+    stream_in_queue_frames: int = Field(default=50, alias="STREAM_IN_QUEUE_FRAMES")
+    stream_out_queue_frames: int = Field(default=25, alias="STREAM_OUT_QUEUE_FRAMES")
+    stream_playback_lead_ms: int = Field(default=200, alias="STREAM_PLAYBACK_LEAD_MS")
+
+    # Call-event log: webhooks enqueue one event per turn (never blocking; events
+    # are dropped and counted when the queue is full) and a background writer
+    # inserts them in batches of up to CALL_EVENTS_BATCH_SIZE, at least every
+    # CALL_EVENTS_FLUSH_INTERVAL_SECONDS
+    call_events_enabled: bool = Field(default=True, alias="CALL_EVENTS_ENABLED")
+    call_events_queue_size: int = Field(default=10000, alias="CALL_EVENTS_QUEUE_SIZE")
+    call_events_batch_size: int = Field(default=500, alias="CALL_EVENTS_BATCH_SIZE")
+    call_events_flush_interval_seconds: float = Field(default=1.0, alias="CALL_EVENTS_FLUSH_INTERVAL_SECONDS")
+
+    # Region used to read phone numbers written without a country code
+    # (e.g. "4155551234" -> "+14155551234" for US)
+    default_phone_region: str = Field(default="US", alias="DEFAULT_PHONE_REGION")
 
     # Defaults for personalization
     default_language: str = Field(default="en-US", alias="DEFAULT_LANGUAGE")
@@ -1,7 +1,13 @@
 from __future__ import annotations
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+import importlib.util
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import settings
 
 
@@ -9,11 +15,98 @@ class Base(DeclarativeBase):
     pass
 
 
-engine = create_async_engine(settings.database_url, echo=False, future=True)
+def _normalize_url(url: str) -> str:
+    # Plain postgres URLs get the asyncpg driver.
+    for prefix in ("postgres://", "postgresql://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    database = make_url(url).database or ""
+    return database in ("", ":memory:") or "mode=memory" in url
+
+
+def _engine_options(url: str) -> dict[str, Any]:
+    backend = make_url(url).get_backend_name()
+    options: dict[str, Any] = {"echo": False, "future": True}
+    if backend == "sqlite":
+        options["connect_args"] = {"timeout": settings.sqlite_busy_timeout_ms / 1000}
+        if not _is_sqlite_memory(url):
+            # aiosqlite defaults to NullPool (a new connection, and PRAGMA
+            # setup, per session); keep connections around instead. In-memory
+            # databases use a single static connection.
+            options.update(
+                poolclass=AsyncAdaptedQueuePool,
+                pool_size=settings.db_pool_size,
+                max_overflow=settings.db_max_overflow,
+                pool_timeout=settings.db_pool_timeout_seconds,
+            )
+    elif backend == "postgresql":
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout_seconds,
+            pool_recycle=settings.db_pool_recycle_seconds,
+            pool_pre_ping=True,
+            connect_args={"prepared_statement_cache_size": settings.db_statement_cache_size},
+        )
+    return options
+
+
+def _install_sqlite_pragmas(engine: AsyncEngine, url: str) -> None:
+    """WAL so readers don't block on writers, NORMAL fsync, mmap and busy timeout."""
+    pragmas = [
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA cache_size={settings.sqlite_cache_size}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    if not _is_sqlite_memory(url):
+        pragmas += [
+            f"PRAGMA journal_mode={settings.sqlite_journal_mode}",
+            f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+        ]
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def build_engine(url: str) -> AsyncEngine:
+    url = _normalize_url(url)
+    # asyncpg is optional: only PostgreSQL deployments need it.
+    if make_url(url).drivername == "postgresql+asyncpg" and importlib.util.find_spec("asyncpg") is None:
+        raise RuntimeError("DATABASE_URL points at PostgreSQL; install the driver with `pip install asyncpg`")
+    new_engine = create_async_engine(url, **_engine_options(url))
+    if make_url(url).get_backend_name() == "sqlite":
+        _install_sqlite_pragmas(new_engine, url)
+    return new_engine
+
+
+engine = build_engine(settings.database_url)
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
+# Optional read-only replica for hot read paths (profile lookups); falls back
+# to the primary when DATABASE_REPLICA_URL is unset.
+read_engine = build_engine(settings.database_replica_url) if settings.database_replica_url else engine
+ReadSessionLocal = async_sessionmaker(read_engine, expire_on_commit=False, class_=AsyncSession)
+
 
 async def get_db() -> AsyncSession:
     async with SessionLocal() as session:
         yield session
 
+
+if settings.database_replica_url:
+    async def get_read_db() -> AsyncSession:
+        async with ReadSessionLocal() as session:
+            yield session
+else:
+    # Same dependency object, so FastAPI hands a request one shared session
+    # instead of checking out two connections from the same pool.
+    get_read_db = get_db
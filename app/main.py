@@ -1,25 +1,46 @@
 from __future__ import annotations
 
 import asyncio
+import logging
 from pathlib import Path
 
 from base64 import b64decode
 
 from fastapi import FastAPI
-from fastapi.responses import Response
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from sqlalchemy.ext.asyncio import AsyncEngine
 
 from app.config import settings
-from app.db import Base, engine
+from app import warmup
+from app.db import engine
+from app.migrations import prepare_database
+from app.routers import events as events_router
 from app.routers import profiles as profiles_router
+from app.routers import tts as tts_router
 from app.routers import voice as voice_router
-
+from app.services import crm as crm_svc
+from app.services import events
+from app.services import media_stream
+from app.services import prefetch
+from app.services import profiles as prof_svc
+from app.services import speculation
+from app.services import sync
+from app.services import tts
+from app.services.nlp import reply_sources
+from app.services.reply_cache import reply_cache
+from app.utils import metrics
+from app.utils.admission import LIMITERS
+from app.utils.timing import TimingMiddleware
+
+
+logger = logging.getLogger(__name__)
 
 _FAVICON_PNG = b64decode(
     "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mP8/xcAAgMBAp/n8SkAAAAASUVORK5CYII="
 )
 
 app = FastAPI(title="Personalized Customer Care Response System")
+app.add_middleware(TimingMiddleware)
 
 
 @app.get("/favicon.ico", include_in_schema=False)
@@ -29,22 +50,76 @@ async def favicon():
 
 @app.on_event("startup")
 async def on_startup():
-    # Create database tables if not present (simple auto-migration for MVP)
     data_dir = Path("data")
     data_dir.mkdir(exist_ok=True)
-    async with engine.begin() as conn:  # type: ignore[call-arg]
-        await conn.run_sync(Base.metadata.create_all)
+    # Create database tables if not present (simple auto-migration for MVP);
+    # `python -m app.cli serve` does this once before starting its workers.
+    if settings.db_schema_on_startup:
+        await prepare_database(engine)
+    await crm_svc.startup()
+    events.start()
+    tts.start_precompute(voice_router.static_speech())
+    if settings.warmup_before_serving:
+        await warmup.run()
+    else:
+        warmup.start()
+    if settings.crm_sync_on_startup:
+        sync.start_background()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await warmup.shutdown()
+    await sync.shutdown()
+    await prefetch.shutdown()
+    await speculation.shutdown()
+    await crm_svc.shutdown()
+    await tts.shutdown()
+    await events.shutdown()
 
 
 @app.get("/healthz")
 async def healthz():
+    # Not ready (503) until this worker has warmed up; see app/warmup.py.
+    if not warmup.is_ready():
+        return JSONResponse({"status": "warming", "env": settings.app_env}, status_code=503)
     return {
         "status": "ok",
         "env": settings.app_env,
     }
 
 
+def _scrape_samples() -> list[metrics.Sample]:
+    # Counters kept by the caches themselves, read at scrape time.
+    samples: list[metrics.Sample] = []
+    caches = {
+        "profile": prof_svc.profile_cache.stats(),
+        "crm_negative": crm_svc.negative_cache.stats(),
+        "reply": {"hits": reply_cache.memory_hits + reply_cache.persistent_hits, "misses": reply_cache.misses},
+    }
+    for kind in ("hits", "misses"):
+        for cache, stats in caches.items():
+            samples.append((f"cache_{kind}_total", "counter", f"Cache {kind} per cache.", {"cache": cache}, stats[kind]))
+    for source, count in reply_sources.items():
+        samples.append(("reply_source_total", "counter", "Caller turns by how the reply was produced.", {"source": source}, count))
+    for name, limiter in LIMITERS.items():
+        samples.append(("admission_in_flight", "gauge", "Calls holding an admission slot.", {"dependency": name}, limiter.active))
+    for name, limiter in LIMITERS.items():
+        samples.append(("admission_queue_depth", "gauge", "Calls waiting for an admission slot.", {"dependency": name}, limiter.queue_depth))
+    samples.append(("media_streams_active", "gauge", "Open Media Streams WebSockets.", {}, media_stream.active()))
+    samples.append(("call_events_queue_depth", "gauge", "Call events waiting for the batch writer.", {}, events.queue_depth()))
+    samples.append(("crm_breaker_open", "gauge", "1 while the CRM circuit breaker is short-circuiting.", {}, int(crm_svc.breaker.state == "open")))
+    return samples
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(_scrape_samples()), media_type="text/plain; version=0.0.4")
+
+
 app.include_router(profiles_router.router)
 app.include_router(voice_router.router)
+app.include_router(events_router.router)
+app.include_router(tts_router.router)
 
 
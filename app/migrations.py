@@ -0,0 +1,117 @@
+"""
+In-place schema migrations for databases created before a column existed.
+
+`Base.metadata.create_all` only creates missing tables, so columns added
+later are added (and backfilled) here. Every step is idempotent: startup runs
+them on each boot (`python -m app.cli serve` once, before forking its
+workers) and they are no-ops once applied. Large tables can be
+migrated ahead of a deploy with `python -m app.cli backfill-phones`.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from sqlalchemy import bindparam, inspect, select, text, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.db import Base
+from app.models import Customer
+from app.utils.phone import to_e164
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PhoneBackfillReport:
+    keyed: int = 0
+    # (e164, kept id, unkeyed id): rows that normalize to the same number.
+    # The most recently updated row keeps the key; the others stay in the
+    # table with phone_e164 NULL for manual merging.
+    duplicates: list[tuple[str, int, int]] = field(default_factory=list)
+
+
+def backfill_phone_e164(conn: Connection, batch_size: int = 1000) -> PhoneBackfillReport:
+    """Add customers.phone_e164 if missing, fill it for unkeyed rows and index it."""
+    table = Customer.__table__
+    columns = {col["name"] for col in inspect(conn).get_columns(table.name)}
+    if "phone_e164" not in columns:
+        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN phone_e164 VARCHAR(32)"))
+
+    report = PhoneBackfillReport()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(Customer.id, Customer.phone_number, Customer.updated_at)
+            .where(Customer.phone_e164.is_(None), Customer.id > last_id)
+            .order_by(Customer.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        _key_batch(conn, rows, report)
+
+    # A key can change hands more than once; report each loser against the final owner.
+    kept = {key: row_id for key, row_id, _ in report.duplicates}
+    report.duplicates = [(key, kept[key], row_id) for key, _, row_id in report.duplicates]
+
+    for index in table.indexes:
+        if index.name == "ix_customers_phone_e164":
+            index.create(conn, checkfirst=True)
+    return report
+
+
+def _key_batch(conn: Connection, rows: list, report: PhoneBackfillReport) -> None:
+    table = Customer.__table__
+    keys = {row.id: to_e164(row.phone_number) for row in rows}
+    current = {
+        row.phone_e164: (row.id, row.updated_at)
+        for row in conn.execute(
+            select(Customer.phone_e164, Customer.id, Customer.updated_at)
+            .where(Customer.phone_e164.in_(set(keys.values())))
+        )
+    }
+    owners = dict(current)
+    for row in rows:
+        key = keys[row.id]
+        owner = owners.get(key)
+        if owner is None:
+            owners[key] = (row.id, row.updated_at)
+        elif (row.updated_at or datetime.min) > (owner[1] or datetime.min):
+            report.duplicates.append((key, row.id, owner[0]))
+            owners[key] = (row.id, row.updated_at)
+        else:
+            report.duplicates.append((key, owner[0], row.id))
+
+    # Release keys whose previous owner lost to a newer row before reassigning.
+    # updated_at is written back as-is so the backfill doesn't count as an edit.
+    released = [owner[0] for key, owner in current.items() if owners[key][0] != owner[0]]
+    if released:
+        conn.execute(update(table).where(table.c.id.in_(released)).values(phone_e164=None, updated_at=table.c.updated_at))
+    assigned = [(key, owner[0]) for key, owner in owners.items() if current.get(key, (None,))[0] != owner[0]]
+    if assigned:
+        conn.execute(
+            update(table)
+            .where(table.c.id == bindparam("row_id"))
+            .values(phone_e164=bindparam("key"), updated_at=table.c.updated_at),
+            [{"row_id": row_id, "key": key} for key, row_id in assigned],
+        )
+    report.keyed += len(assigned) - len(released)
+
+
+async def prepare_database(engine: AsyncEngine) -> PhoneBackfillReport:
+    """Create missing tables and apply the migrations above. Idempotent."""
+    async with engine.begin() as conn:  # type: ignore[call-arg]
+        await conn.run_sync(Base.metadata.create_all)
+        phones = await conn.run_sync(backfill_phone_e164)
+    if phones.duplicates:
+        logger.warning(
+            "%d customers share a phone number with a newer row; see `python -m app.cli backfill-phones`",
+            len(phones.duplicates),
+        )
+    return phones
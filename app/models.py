@@ -4,7 +4,7 @@ from datetime import datetime
 from enum import Enum
 
 from pydantic import BaseModel, Field
-from sqlalchemy import String, DateTime
+from sqlalchemy import DateTime, Float, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db import Base
@@ -21,6 +21,8 @@ class Customer(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     phone_number: Mapped[str] = mapped_column(String(32), unique=True, index=True)
+    # Canonical E.164 form of phone_number; the lookup key (see app.utils.phone)
+    phone_e164: Mapped[str | None] = mapped_column(String(32), unique=True, index=True, nullable=True)
     name: Mapped[str | None] = mapped_column(String(128), nullable=True)
     gender: Mapped[str] = mapped_column(String(16), default=GenderEnum.neutral.value)
     language_code: Mapped[str] = mapped_column(String(16), default="en-US")
@@ -28,6 +30,29 @@ class Customer(Base):
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+class CallEvent(Base):
+    """One row per webhook turn, written in batches by app.services.events."""
+
+    __tablename__ = "call_events"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, index=True)
+    call_sid: Mapped[str] = mapped_column(String(64), index=True)
+    phone_number: Mapped[str] = mapped_column(String(32))
+    kind: Mapped[str] = mapped_column(String(16))  # "incoming" or "turn"
+    language_code: Mapped[str] = mapped_column(String(16))
+    voice: Mapped[str] = mapped_column(String(32))
+    profile_found: Mapped[bool] = mapped_column(default=False)
+    utterance_chars: Mapped[int] = mapped_column(Integer, default=0)
+    reply_source: Mapped[str | None] = mapped_column(String(16), nullable=True)
+    latency_ms: Mapped[float] = mapped_column(Float)
+    db_ms: Mapped[float] = mapped_column(Float, default=0.0)
+    crm_ms: Mapped[float] = mapped_column(Float, default=0.0)
+    lang_detect_ms: Mapped[float] = mapped_column(Float, default=0.0)
+    llm_ms: Mapped[float] = mapped_column(Float, default=0.0)
+    twiml_ms: Mapped[float] = mapped_column(Float, default=0.0)
+
+
 # Pydantic schemas
 class CustomerCreate(BaseModel):
     phone_number: str
@@ -52,3 +77,23 @@ class CustomerOut(BaseModel):
     class Config:
         from_attributes = True
 
+
+class ProfileLookupRequest(BaseModel):
+    phone_numbers: list[str] = Field(max_length=10000)
+    crm_fallback: bool = False
+
+
+class ProfileLookupOut(BaseModel):
+    profiles: dict[str, CustomerOut]
+    misses: list[str]
+
+
+class CallEventSummary(BaseModel):
+    language_code: str
+    calls: int
+    turns: int
+    avg_latency_ms: float
+    max_latency_ms: float
+    avg_incoming_latency_ms: float
+    avg_stage_ms: dict[str, float]
+    reply_sources: dict[str, int]
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_read_db
+from app.models import CallEventSummary
+from app.services import events as svc
+
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+@router.get("/summary", response_model=list[CallEventSummary])
+async def events_summary(
+    hours: float = Query(default=24.0, gt=0, description="Look-back window"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    return await svc.summary(db, since=datetime.utcnow() - timedelta(hours=hours))
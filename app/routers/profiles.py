@@ -1,10 +1,16 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import get_db
-from app.models import CustomerOut, CustomerCreate, CustomerUpdate, Customer
+from app.config import settings
+from app.db import get_db, get_read_db
+from app.models import CustomerOut, CustomerCreate, CustomerUpdate, Customer, ProfileLookupRequest, ProfileLookupOut
+from app.services import bulk
+from app.services import crm as crm_svc
 from app.services import profiles as svc
 
 
@@ -21,13 +27,45 @@ async def create_profile(payload: CustomerCreate, db: AsyncSession = Depends(get
 
 
 @router.get("/by_phone/{phone}", response_model=CustomerOut)
-async def get_profile_by_phone(phone: str, db: AsyncSession = Depends(get_db)):
+async def get_profile_by_phone(phone: str, db: AsyncSession = Depends(get_read_db)):
     obj = await svc.get_by_phone(db, phone)
     if not obj:
         raise HTTPException(status_code=404, detail="Not found")
     return obj
 
 
+@router.post("/lookup", response_model=ProfileLookupOut)
+async def lookup_profiles(
+    payload: ProfileLookupRequest,
+    db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db),
+):
+    requested = list(dict.fromkeys(payload.phone_numbers))
+    found = await svc.get_many_by_phone(read_db, requested)
+    misses = [phone for phone in requested if phone not in found]
+
+    if misses and payload.crm_fallback:
+        fetched = await crm_svc.fetch_many(misses, concurrency=settings.profile_lookup_crm_concurrency)
+        if fetched:
+            await svc.upsert_many_from_crm(
+                db,
+                list(fetched.values()),
+                settings.default_language,
+                settings.default_gender,
+            )
+            # The CRM may answer with its own formatting of the number.
+            stored = await svc.get_many_by_phone(db, [p.phone_number for p in fetched.values()])
+            for phone, crm_profile in fetched.items():
+                if crm_profile.phone_number in stored:
+                    found[phone] = stored[crm_profile.phone_number]
+            misses = [phone for phone in misses if phone not in found]
+
+    return ProfileLookupOut(
+        profiles={phone: CustomerOut.model_validate(obj) for phone, obj in found.items()},
+        misses=misses,
+    )
+
+
 @router.put("/{id}", response_model=CustomerOut)
 async def update_profile(id: int, payload: CustomerUpdate, db: AsyncSession = Depends(get_db)):
     obj = await db.get(Customer, id)
@@ -35,3 +73,19 @@ async def update_profile(id: int, payload: CustomerUpdate, db: AsyncSession = De
         raise HTTPException(status_code=404, detail="Not found")
     updated = await svc.update(db, obj, payload)
     return updated
+
+
+@router.post("/import")
+async def import_profiles(
+    request: Request,
+    format: Literal["ndjson", "csv"] | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    # Body is NDJSON (one CustomerCreate per line) or CSV with a header row.
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    return await bulk.import_profiles(db, request.stream(), fmt)
+
+
+@router.get("/export")
+async def export_profiles(format: Literal["ndjson", "csv"] = "ndjson"):
+    return StreamingResponse(bulk.export_profiles(format), media_type=bulk.MEDIA_TYPES[format])
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import asyncio
+import re
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+
+from app.services import tts
+
+
+router = APIRouter(prefix="/tts", tags=["tts"])
+
+_FILENAME = re.compile(r"^[0-9a-f]{64}\.(wav|mp3)$")
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _byte_range(header: str, size: int) -> tuple[int, int] | None:
+    """(start, end inclusive) for a single-range `Range` header; None if unsatisfiable."""
+    match = _RANGE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:  # suffix range: the last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    return (start, end) if start <= end else None
+
+
+@router.api_route("/{filename}", methods=["GET", "HEAD"], include_in_schema=False)
+async def tts_audio(filename: str, request: Request):
+    if not _FILENAME.match(filename):
+        raise HTTPException(status_code=404, detail="Not found")
+    path = tts.audio_path(filename)
+    try:
+        audio = await asyncio.to_thread(path.read_bytes)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Not found") from None
+
+    # Content-addressed: the name is the hash of what was synthesized, so the
+    # file never changes and can be cached forever.
+    etag = f'"{filename.split(".")[0]}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Accept-Ranges": "bytes",
+    }
+    media_type = tts.media_type(filename)
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    size = len(audio)
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range == etag):
+        span = _byte_range(range_header, size)
+        if span is None:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        start, end = span
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        body = audio[start:end + 1]
+        status = 206
+    else:
+        body = audio
+        status = 200
+    if request.method == "HEAD":
+        headers["Content-Length"] = str(len(body))
+        return Response(status_code=status, headers=headers, media_type=media_type)
+    return Response(content=body, status_code=status, headers=headers, media_type=media_type)
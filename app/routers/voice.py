@@ -1,20 +1,46 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, Form, Request
+import logging
+
+from fastapi import APIRouter, Depends, Form, Request, Response, WebSocket
 from sqlalchemy.ext.asyncio import AsyncSession
-from langdetect import detect as lang_detect
 
 from app.config import settings
-from app.db import get_db
-from app.models import GenderEnum
+from app.db import get_db, get_read_db
+from app.models import Customer, GenderEnum
+from app.services import conversation
 from app.services import crm as crm_svc
+from app.services import events
+from app.services import langid
+from app.services import media_stream
 from app.services import nlp
+from app.services import prefetch
 from app.services import profiles as prof_svc
-from app.utils.twiml import xml_response, say_twiml, gather_speech_twiml
+from app.services import sessions
+from app.services import speculation
+from app.services import tts
+from app.utils.phone import to_e164
+from app.utils.timing import stage
+from app.utils.twiml import (
+    connect_stream_response,
+    gather_reply_response,
+    gather_response,
+    play_response,
+    precompile_gather,
+    say_response,
+)
+
 
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["voice"]) 
 
+WELCOME_PROMPTS = {
+    "en": "Welcome. Please say your question after the beep.",
+    "hi": "स्वागत है। बीप के बाद अपना प्रश्न बोलें।",
+    "mr": "स्वागत आहे. बीपनंतर आपला प्रश्न बोला.",
+}
+
 
 def select_voice(language_code: str, gender: str) -> tuple[str, str]:
     """
@@ -46,57 +72,165 @@ def select_voice(language_code: str, gender: str) -> tuple[str, str]:
     return twilio_lang, voice
 
 
+_STATIC_LANGUAGES = ("en-US", "hi-IN", "mr-IN")
+
+
+def _partial_url() -> str | None:
+    return "/voice/partial" if settings.speculative_replies_enabled else None
+
+
+def precompile_prompts() -> None:
+    """Render the welcome <Gather> for every language/gender combination up front."""
+    languages = {settings.default_language, *_STATIC_LANGUAGES}
+    for language in languages:
+        for gender in GenderEnum:
+            twilio_lang, voice = select_voice(language, gender.value)
+            prompt = WELCOME_PROMPTS.get(language.split("-")[0], WELCOME_PROMPTS["en"])
+            precompile_gather(prompt, "/voice/handle", twilio_lang, voice, partial_url=_partial_url())
+
+
+def static_speech() -> list[tuple[str, str, str]]:
+    """(text, language, gender) for every fixed prompt and template reply, for TTS precompute."""
+    items = []
+    for language in {settings.default_language, *_STATIC_LANGUAGES}:
+        prompt = WELCOME_PROMPTS.get(language.split("-")[0], WELCOME_PROMPTS["en"])
+        for gender in GenderEnum:
+            items.append((prompt, language, gender.value))
+            items.append((nlp.fallback_reply(language), language, gender.value))
+    return items
+
+
+async def _speak(text: str, language: str, gender: str, twilio_lang: str, voice: str) -> Response:
+    # Synthesized audio when a TTS provider is configured and keeps up, else
+    # <Say>; inside another <Gather> while calls are multi-turn.
+    audio_url = await tts.synthesize_to_url(text, language, gender)
+    # Timed here rather than inside the twiml helpers, which stay as cheap as
+    # plain rendering (benchmarks/twiml_bench.py).
+    with stage("twiml"):
+        if settings.conversation_turns > 0:
+            return gather_reply_response(text, "/voice/handle", twilio_lang, voice, audio_url, _partial_url())
+        if audio_url:
+            return play_response(audio_url)
+        return say_response(text, language=twilio_lang, voice=voice)
+
+
+def _stream_url(request: Request) -> str:
+    # <Stream> needs an absolute ws(s):// URL.
+    base = settings.public_base_url.rstrip("/") or str(request.base_url).rstrip("/")
+    return base.replace("https://", "wss://", 1).replace("http://", "ws://", 1) + media_stream.ROUTE
+
+
+async def _reply(call_sid: str, utterance: str, language: str, name: str | None) -> nlp.Reply:
+    if not call_sid:
+        return await nlp.generate_reply_within(utterance, language_code=language, name=name)
+    # Reuse the reply speculatively generated from partial results, if it matches.
+    reply = await speculation.take(call_sid, utterance, language, name)
+    if reply is None:
+        history = await conversation.store.history(call_sid)
+        reply = await nlp.generate_reply_within(utterance, language_code=language, name=name, history=history)
+    else:
+        nlp.count_source(reply)
+    if utterance:
+        await conversation.store.append(call_sid, conversation.Turn(utterance, reply.text))
+    return reply
+
+
+async def _remember(
+    call_sid: str,
+    caller: str,
+    profile: Customer | None,
+    language: str,
+    gender: str,
+    twilio_lang: str,
+    voice: str,
+) -> None:
+    if not call_sid:
+        return
+    await sessions.store.set(
+        sessions.CallSession(
+            call_sid=call_sid,
+            phone=caller,
+            profile_id=profile.id if profile else None,
+            name=profile.name if profile else None,
+            gender=gender,
+            language_code=language,
+            twilio_language=twilio_lang,
+            voice=voice,
+        )
+    )
+
+
 @router.post("/voice/incoming")
-async def voice_incoming(request: Request, db: AsyncSession = Depends(get_db)):
+async def voice_incoming(request: Request, read_db: AsyncSession = Depends(get_read_db)):
     # Twilio will provide caller number in `From` like +14155551234
     form = await request.form()
-    caller = str(form.get("From") or "").strip()
+    caller = to_e164(str(form.get("From") or ""))
+    call_sid = str(form.get("CallSid") or "").strip()
 
-    # Find profile or use defaults
+    # Find profile or use defaults; a CRM lookup runs in the background while
+    # the caller listens to the prompt and /voice/handle picks it up.
     profile = None
     if caller:
-        profile = await prof_svc.get_by_phone(db, caller)
+        profile = await prof_svc.get_by_phone(read_db, caller)
         if not profile:
-            external = await crm_svc.fetch_profile(caller)
-            if external:
-                profile = await prof_svc.upsert_from_crm(
-                    db,
-                    external,
-                    settings.default_language,
-                    settings.default_gender,
-                )
+            prefetch.start(caller)
 
     language = (profile.language_code if profile else settings.default_language)
     gender = (profile.gender if profile else settings.default_gender)
     twilio_lang, voice = select_voice(language, gender)
+    await _remember(call_sid, caller, profile, language, gender, twilio_lang, voice)
 
-    prompt = {
-        "en": "Welcome. Please say your question after the beep.",
-        "hi": "स्वागत है। बीप के बाद अपना प्रश्न बोलें।",
-        "mr": "स्वागत आहे. बीपनंतर आपला प्रश्न बोला.",
-    }.get(language.split("-")[0], "Welcome. Please say your question after the beep.")
-
-    twiml = gather_speech_twiml(
-        prompt=prompt,
-        action_url=f"/voice/handle",
-        language=twilio_lang,
-        voice=voice,
-        hints=None,
-    )
-    return xml_response(twiml)
+    prompt = WELCOME_PROMPTS.get(language.split("-")[0], WELCOME_PROMPTS["en"])
+    audio_url = await tts.synthesize_to_url(prompt, language, gender)
+
+    with stage("twiml"):
+        if media_stream.available():
+            # The rest of the call runs over /voice/stream instead of /voice/handle.
+            response = connect_stream_response(prompt, _stream_url(request), twilio_lang, voice, audio_url)
+        else:
+            response = gather_response(
+                prompt=prompt,
+                action_url="/voice/handle",
+                language=twilio_lang,
+                voice=voice,
+                hints=None,
+                audio_url=audio_url,
+                partial_url=_partial_url(),
+            )
+    events.record("incoming", call_sid, caller, language, voice, profile_found=profile is not None)
+    return response
 
 
 @router.post("/voice/handle")
 async def voice_handle(
     request: Request,
     db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db),
     From: str = Form(default=""),
     SpeechResult: str = Form(default=""),
+    CallSid: str = Form(default=""),
 ):
-    caller = (From or "").strip()
+    caller = to_e164(From or "")
     utterance = (SpeechResult or "").strip()
+    call_sid = (CallSid or "").strip()
 
-    profile = await prof_svc.get_by_phone(db, caller) if caller else None
+    # Later turns of a call reuse what /voice/incoming already resolved.
+    session = await sessions.store.get(call_sid) if call_sid else None
+    if session and session.resolved:
+        reply = await _reply(call_sid, utterance, session.language_code, session.name)
+        logger.debug("call %s turn served by %s", call_sid, reply.source)
+        response = await _speak(reply.text, session.language_code, session.gender, session.twilio_language, session.voice)
+        events.record(
+            "turn", call_sid, caller, session.language_code, session.voice,
+            profile_found=session.profile_id is not None, utterance=utterance, reply_source=reply.source,
+        )
+        return response
+
+    profile = None
+    if caller:
+        profile = await prefetch.wait(caller, timeout=settings.crm_timeout_seconds)
+        if not profile:
+            profile = await prof_svc.get_by_phone(read_db, caller)
     if not profile and caller:
         external = await crm_svc.fetch_profile(caller)
         if external:
@@ -106,14 +240,10 @@ async def voice_handle(
                 settings.default_language,
                 settings.default_gender,
             )
+    found = profile is not None
     if not profile:
         # Create a default profile with detected language if possible
-        detected = None
-        try:
-            if utterance:
-                detected = lang_detect(utterance)
-        except Exception:
-            detected = None
+        detected = langid.detect(utterance)
         lang_map = {"en": "en-US", "hi": "hi-IN", "mr": "mr-IN"}
         language = lang_map.get(detected, settings.default_language)
         profile = await prof_svc.get_or_create_default(db, caller or "unknown", language, settings.default_gender)
@@ -121,12 +251,38 @@ async def voice_handle(
     language = profile.language_code
     gender = profile.gender
     twilio_lang, voice = select_voice(language, gender)
+    await _remember(call_sid, caller, profile, language, gender, twilio_lang, voice)
 
-    reply_text = await nlp.generate_reply(utterance, language_code=language, name=profile.name)
-    twiml = say_twiml(reply_text, language=twilio_lang, voice=voice)
-    return xml_response(twiml)
-
+    reply = await _reply(call_sid, utterance, language, profile.name)
+    logger.debug("call %s turn served by %s", call_sid, reply.source)
+    response = await _speak(reply.text, language, gender, twilio_lang, voice)
+    events.record(
+        "turn", call_sid, caller, language, voice,
+        profile_found=found, utterance=utterance, reply_source=reply.source,
+    )
+    return response
 
 
+@router.post("/voice/partial")
+async def voice_partial(
+    CallSid: str = Form(default=""),
+    SequenceNumber: int = Form(default=0),
+    StableSpeechResult: str = Form(default=""),
+    UnstableSpeechResult: str = Form(default=""),
+):
+    # <Gather partialResultCallback>; Twilio ignores the response body.
+    call_sid = CallSid.strip()
+    session = await sessions.store.get(call_sid) if call_sid else None
+    if session:
+        speculation.partial(
+            call_sid, SequenceNumber, StableSpeechResult, UnstableSpeechResult,
+            session.language_code, session.name,
+        )
+    return Response(status_code=204)
 
 
+@router.websocket("/voice/stream")
+async def voice_stream(websocket: WebSocket):
+    # Twilio Media Streams, connected by the <Connect><Stream> from /voice/incoming.
+    await websocket.accept()
+    await media_stream.MediaStreamCall(websocket).run()
@@ -1,13 +1,85 @@
 """
 ASR abstraction.
 
-MVP uses Twilio <Gather input="speech"> so Twilio provides SpeechResult.
-This module is a placeholder to plug external ASR providers if needed.
+The <Gather> flow uses Twilio <Gather input="speech">, so Twilio provides
+SpeechResult. The Media Streams flow (`app.services.media_stream`) does its
+own recognition: `recognizer(language_code)` returns a per-call
+`StreamingRecognizer` fed 20 ms frames of 8 kHz mu-law audio, or None when
+no ASR_PROVIDER is configured.
+
+Providers:
+  stub  energy-based endpointing only (no words): reports speech starts as
+        partial transcripts and each utterance, once followed by
+        ASR_SILENCE_MS of silence, as a final transcript describing it
 """
 
 from __future__ import annotations
 
-from typing import Optional
+from dataclasses import dataclass
+from typing import Optional, Protocol
+
+from app.config import settings
+from app.utils import mulaw
+
+
+@dataclass
+class Transcript:
+    text: str
+    final: bool  # False: caller is (still) speaking; text may be partial or empty
+
+
+class StreamingRecognizer(Protocol):
+    async def feed(self, frame: bytes) -> list[Transcript]: ...
+
+    async def close(self) -> list[Transcript]: ...
+
+
+class StubRecognizer:
+    """Voice-activity detection on frame energy; stands in for a streaming ASR service."""
+
+    frame_ms = 20
+
+    def __init__(self, language_code: str) -> None:
+        self.language_code = language_code
+        self.threshold = settings.asr_energy_threshold
+        self.silence_frames = max(1, settings.asr_silence_ms // self.frame_ms)
+        self._speech = 0  # speech frames in the current utterance
+        self._quiet = 0  # silent frames since the last speech frame
+
+    async def feed(self, frame: bytes) -> list[Transcript]:
+        if mulaw.rms(frame) >= self.threshold:
+            self._speech += 1
+            self._quiet = 0
+            # Two frames in a row, so a click doesn't count as the caller talking.
+            return [Transcript("", final=False)] if self._speech == 2 else []
+        if not self._speech:
+            return []
+        self._quiet += 1
+        if self._quiet < self.silence_frames:
+            return []
+        return self._end()
+
+    async def close(self) -> list[Transcript]:
+        return self._end() if self._speech else []
+
+    def _end(self) -> list[Transcript]:
+        seconds = self._speech * self.frame_ms / 1000
+        self._speech = self._quiet = 0
+        if seconds < 2 * self.frame_ms / 1000:
+            return []
+        return [Transcript(f"The caller spoke for {seconds:.1f} seconds.", final=True)]
+
+
+_PROVIDERS = {"stub": StubRecognizer}
+
+
+def available() -> bool:
+    return settings.asr_provider in _PROVIDERS
+
+
+def recognizer(language_code: str) -> Optional[StreamingRecognizer]:
+    factory = _PROVIDERS.get(settings.asr_provider)
+    return factory(language_code) if factory else None
 
 
 async def transcribe_audio(url: str) -> Optional[str]:
@@ -16,4 +88,3 @@ async def transcribe_audio(url: str) -> Optional[str]:
     Not used in current Twilio <Gather> flow.
     """
     return None
-
@@ -0,0 +1,162 @@
+"""
+Streaming bulk profile import/export (NDJSON or CSV).
+
+Import parses the request body incrementally and upserts in batches, so
+memory stays flat regardless of upload size. Export streams rows from a
+server-side cursor. Quoted CSV fields may span lines; a row whose column
+count doesn't match the header is reported as an error.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+from typing import Any, AsyncIterator
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models import Customer, CustomerCreate
+from app.services import profiles as svc
+
+EXPORT_COLUMNS = ("id", "phone_number", "name", "gender", "language_code")
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# A quoted CSV field still open after this much text is reported, not buffered further.
+_MAX_CSV_RECORD_CHARS = 64 * 1024
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r").decode("utf-8-sig")
+    if buffer:
+        yield buffer.rstrip(b"\r").decode("utf-8-sig")
+
+
+async def _iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, list[str] | ValueError]]:
+    """Yield (first line number, fields or error) per CSV record; quoted fields may contain newlines."""
+    pending: list[str] = []
+    start = 0
+    line_no = 0
+    async for line in _iter_lines(chunks):
+        line_no += 1
+        if not pending:
+            if not line.strip():
+                continue
+            start = line_no
+        pending.append(line)
+        text = "\n".join(pending)
+        if text.count('"') % 2:  # inside a quoted field ("" escapes come in pairs)
+            if len(text) > _MAX_CSV_RECORD_CHARS:
+                pending = []
+                yield start, ValueError("unterminated quoted field")
+            continue
+        pending = []
+        try:
+            yield start, next(csv.reader([text], strict=True))
+        except csv.Error as exc:
+            yield start, ValueError(str(exc))
+    if pending:
+        yield start, ValueError("unterminated quoted field")
+
+
+async def _iter_records(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[tuple[int, Any]]:
+    """Yield (line_number, parsed record or exception) for each non-blank record."""
+    if fmt == "csv":
+        header: list[str] | None = None
+        async for line_no, values in _iter_csv_rows(chunks):
+            if isinstance(values, ValueError):
+                yield line_no, values
+            elif header is None:
+                header = [h.strip() for h in values]
+            elif len(values) != len(header):
+                yield line_no, ValueError(f"expected {len(header)} columns, got {len(values)}")
+            else:
+                yield line_no, {k: (v or None) for k, v in zip(header, values)}
+        return
+    line_no = 0
+    async for line in _iter_lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError as exc:
+            yield line_no, exc
+
+
+def _to_row(payload: CustomerCreate) -> dict[str, Any]:
+    row: dict[str, Any] = {"phone_number": payload.phone_number}
+    if payload.name is not None:
+        row["name"] = payload.name
+    if payload.gender is not None:
+        row["gender"] = payload.gender.value
+    if payload.language_code is not None:
+        row["language_code"] = payload.language_code
+    return row
+
+
+async def import_profiles(db: AsyncSession, chunks: AsyncIterator[bytes], fmt: str) -> dict[str, Any]:
+    processed = 0
+    upserted = 0
+    error_count = 0
+    errors: list[dict[str, Any]] = []
+    batch: list[dict[str, Any]] = []
+
+    def report(line_no: int, message: str) -> None:
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < settings.bulk_max_reported_errors:
+            errors.append({"line": line_no, "error": message})
+
+    async for line_no, record in _iter_records(chunks, fmt):
+        processed += 1
+        if isinstance(record, Exception):
+            report(line_no, f"invalid {'CSV' if fmt == 'csv' else 'JSON'}: {record}")
+            continue
+        try:
+            payload = CustomerCreate.model_validate(record)
+        except ValidationError as exc:
+            report(line_no, "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors()))
+            continue
+        if "\n" in payload.phone_number or "\r" in payload.phone_number:
+            # A quoted CSV field spanning lines: fine for a name, never a number.
+            report(line_no, "phone_number: contains a line break")
+            continue
+        batch.append(_to_row(payload))
+        if len(batch) >= settings.bulk_batch_size:
+            upserted += await svc.bulk_upsert(db, batch)
+            batch = []
+    if batch:
+        upserted += await svc.bulk_upsert(db, batch)
+
+    return {"processed": processed, "upserted": upserted, "error_count": error_count, "errors": errors}
+
+
+async def export_profiles(fmt: str) -> AsyncIterator[bytes]:
+    # Own session: the request-scoped one is closed before the body streams.
+    columns = [getattr(Customer, c) for c in EXPORT_COLUMNS]
+    async with SessionLocal() as db:
+        result = await db.stream(
+            select(*columns).order_by(Customer.id).execution_options(yield_per=settings.bulk_batch_size)
+        )
+        if fmt == "csv":
+            yield (",".join(EXPORT_COLUMNS) + "\r\n").encode()
+        async for rows in result.partitions():
+            buf = io.StringIO()
+            if fmt == "csv":
+                csv.writer(buf).writerows(rows)
+            else:
+                for row in rows:
+                    buf.write(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False))
+                    buf.write("\n")
+            yield buf.getvalue().encode()
@@ -0,0 +1,100 @@
+"""
+Per-call conversation memory keyed by Twilio's CallSid.
+
+Each call keeps only its last CONVERSATION_TURNS (utterance, reply) pairs, a
+ring buffer, so a long call can't grow without bound. Calls are evicted
+CONVERSATION_TTL_SECONDS after their last turn (hung up or abandoned) and at
+most CONVERSATION_MAX are kept, so memory stays flat however many calls come
+and go. As with `app.services.sessions`, the in-memory backend is per worker
+and the SQLite backend (CALL_SESSION_BACKEND=sqlite) is shared by every
+worker on the host.
+"""
+
+from __future__ import annotations
+
+import json
+from collections import deque
+from dataclasses import astuple, dataclass
+from typing import Protocol
+
+from app.config import settings
+from app.utils.cache import TTLCache
+from app.utils.sqlite_kv import SQLiteKV
+
+
+@dataclass(frozen=True)
+class Turn:
+    utterance: str
+    reply: str
+
+
+class ConversationStore(Protocol):
+    async def history(self, call_sid: str) -> list[Turn]: ...
+
+    async def append(self, call_sid: str, turn: Turn) -> None: ...
+
+    async def delete(self, call_sid: str) -> None: ...
+
+
+class MemoryConversationStore:
+    def __init__(self, turns: int, maxsize: int, ttl: float) -> None:
+        self.turns = turns
+        self._cache: TTLCache[str, deque[Turn]] = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def history(self, call_sid: str) -> list[Turn]:
+        return list(self._cache.get(call_sid, ()))
+
+    async def append(self, call_sid: str, turn: Turn) -> None:
+        if self.turns <= 0:
+            return
+        buffer = self._cache.get(call_sid, None)
+        if buffer is None:
+            buffer = deque(maxlen=self.turns)
+        buffer.append(turn)
+        self._cache.set(call_sid, buffer)  # also restarts the TTL
+
+    async def delete(self, call_sid: str) -> None:
+        self._cache.pop(call_sid)
+
+    def stats(self) -> dict[str, float]:
+        return self._cache.stats()
+
+
+class SQLiteConversationStore:
+    """File-backed store shared by every worker that opens the same path."""
+
+    def __init__(self, path: str, turns: int, maxsize: int, ttl: float) -> None:
+        self.turns = turns
+        self._kv = SQLiteKV(path, "conversations", maxsize=maxsize, ttl=ttl)
+
+    async def history(self, call_sid: str) -> list[Turn]:
+        data = await self._kv.get(call_sid)
+        return [Turn(*turn) for turn in json.loads(data)] if data else []
+
+    async def append(self, call_sid: str, turn: Turn) -> None:
+        if self.turns <= 0:
+            return
+        # Read-modify-write is safe: turns of one call arrive one at a time.
+        turns = (await self.history(call_sid) + [turn])[-self.turns:]
+        await self._kv.set(call_sid, json.dumps([astuple(t) for t in turns], ensure_ascii=False))
+
+    async def delete(self, call_sid: str) -> None:
+        await self._kv.delete(call_sid)
+
+
+def _build_store() -> ConversationStore:
+    if settings.call_session_backend == "sqlite":
+        return SQLiteConversationStore(
+            settings.call_session_path,
+            turns=settings.conversation_turns,
+            maxsize=settings.conversation_max,
+            ttl=settings.conversation_ttl_seconds,
+        )
+    return MemoryConversationStore(
+        turns=settings.conversation_turns,
+        maxsize=settings.conversation_max,
+        ttl=settings.conversation_ttl_seconds,
+    )
+
+
+store: ConversationStore = _build_store()
@@ -1,12 +1,21 @@
 from __future__ import annotations
 
+import asyncio
+import importlib.util
+import math
+import time
 from typing import Any
 from urllib.parse import quote_plus
 
 import httpx
-from pydantic import BaseModel, Field, ValidationError
+from pydantic import BaseModel, Field, ValidationError, field_validator
 
 from app.config import settings
+from app.utils.admission import Limiter, Shed
+from app.utils.cache import TTLCache
+from app.utils.metrics import CRM_ERRORS
+from app.utils.phone import to_e164
+from app.utils.timing import stage
 
 
 class CRMProfile(BaseModel):
@@ -20,6 +29,11 @@ class CRMProfile(BaseModel):
         "extra": "allow",
     }
 
+    @field_validator("phone_number")
+    @classmethod
+    def _canonical_phone(cls, value: str) -> str:
+        return to_e164(value)
+
     @property
     def normalized_gender(self) -> str | None:
         return self.gender.lower() if isinstance(self.gender, str) else None
@@ -31,11 +45,243 @@ class CRMProfile(BaseModel):
         return self.language_code.replace("_", "-")
 
 
-async def fetch_profile(phone_number: str) -> CRMProfile | None:
+class CRMUnavailable(Exception):
+    """The CRM couldn't answer: breaker open, shed, transport error or an error status."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker. After `threshold` timeouts/5xx responses the
+    CRM is skipped for `cooldown` seconds; then a single trial request is let
+    through and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, threshold: int, cooldown: float) -> None:
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial_in_flight = False
+        self.short_circuited = 0
+
+    @property
+    def trial_in_flight(self) -> bool:
+        return self._trial_in_flight
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        self.short_circuited += 1
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Give up a half-open trial that never reached the CRM, so the next request may try."""
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+breaker = CircuitBreaker(
+    threshold=settings.crm_breaker_failure_threshold,
+    cooldown=settings.crm_breaker_cooldown_seconds,
+)
+
+# Numbers the CRM answered 404/invalid for; skipped until the entry expires.
+negative_cache: TTLCache[str, bool] = TTLCache(
+    maxsize=settings.crm_negative_cache_size,
+    ttl=settings.crm_negative_ttl_seconds,
+)
+
+# One shared lookup per phone number while a request is outstanding.
+_pending: dict[str, asyncio.Future] = {}
+
+# Application-scoped client, opened/closed by the FastAPI startup/shutdown hooks.
+_client: httpx.AsyncClient | None = None
+
+# Admission control: at most CRM_MAX_IN_FLIGHT requests per worker; others
+# queue briefly and are shed (the caller proceeds with defaults) after that.
+limiter = Limiter(
+    "crm",
+    limit=settings.crm_max_in_flight,
+    queue_wait=settings.crm_queue_wait_seconds,
+    max_queue=settings.crm_max_queue,
+)
+
+
+def _build_client() -> httpx.AsyncClient:
+    # HTTP/2 needs the optional `h2` package (pip install "httpx[http2]").
+    http2 = settings.crm_http2 and importlib.util.find_spec("h2") is not None
+    return httpx.AsyncClient(
+        timeout=settings.crm_timeout_seconds,
+        limits=httpx.Limits(
+            max_connections=settings.crm_max_connections,
+            max_keepalive_connections=settings.crm_max_keepalive_connections,
+            keepalive_expiry=settings.crm_keepalive_expiry_seconds,
+        ),
+        http2=http2,
+    )
+
+
+async def startup() -> None:
+    global _client
+    if _client is None and (settings.crm_api_base_url or settings.crm_list_url):
+        _client = _build_client()
+
+
+async def shutdown() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _get(
+    url: str,
+    params: dict[str, str] | None,
+    headers: dict[str, str],
+    queue_wait: float | None = None,
+) -> httpx.Response:
+    async with limiter.slot(queue_wait):
+        if _client is not None:
+            return await _client.get(url, params=params, headers=headers)
+        # Outside the app lifecycle (scripts, shell) fall back to a one-off client.
+        async with _build_client() as client:
+            return await client.get(url, params=params, headers=headers)
+
+
+def _forget(phone_number: str, future: asyncio.Future) -> None:
+    _pending.pop(phone_number, None)
+    if not future.cancelled():
+        future.exception()  # retrieved here in case every waiter hung up
+
+
+async def lookup(phone_number: str, queue_wait: float | None = None) -> CRMProfile | None:
+    """
+    Look up `phone_number` in the CRM. None when the CRM doesn't know the
+    number; raises CRMUnavailable when it is failing or too busy: a lookup
+    that can't get an admission slot within `queue_wait`
+    (CRM_QUEUE_WAIT_SECONDS by default, math.inf for background jobs) is shed.
+    """
     base_url = settings.crm_api_base_url
     if not base_url or not phone_number:
         return None
+    # One key per subscriber for the negative cache and single-flight map.
+    phone_number = to_e164(phone_number)
+    if negative_cache.get(phone_number, False):
+        return None
+
+    pending = _pending.get(phone_number)
+    if pending is None:
+        if not breaker.allow():
+            CRM_ERRORS.inc("short_circuited")
+            raise CRMUnavailable("circuit open")
+        pending = asyncio.ensure_future(_lookup(base_url, phone_number, queue_wait))
+        _pending[phone_number] = pending
+        pending.add_done_callback(lambda future: _forget(phone_number, future))
+    # Shield so one caller hanging up (cancelling) doesn't abort the shared lookup.
+    with stage("crm"):
+        return await asyncio.shield(pending)
+
+
+async def fetch_profile(phone_number: str, queue_wait: float | None = None) -> CRMProfile | None:
+    """`lookup`, with None also when the CRM is unavailable: live calls proceed with defaults."""
+    try:
+        return await lookup(phone_number, queue_wait)
+    except CRMUnavailable:
+        return None
+
+
+async def lookup_many(
+    phone_numbers: list[str],
+    concurrency: int,
+    queue_wait: float | None = None,
+) -> tuple[dict[str, CRMProfile], list[str]]:
+    """
+    Fan `lookup` out over many numbers, at most `concurrency` at a time.
+    Returns the profiles found and the numbers whose lookup failed; the rest
+    are unknown to the CRM.
+    """
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(phone: str) -> CRMProfile | None:
+        async with limit:
+            return await lookup(phone, queue_wait)
+
+    results = await asyncio.gather(*(one(p) for p in phone_numbers), return_exceptions=True)
+    found: dict[str, CRMProfile] = {}
+    failed: list[str] = []
+    for phone, result in zip(phone_numbers, results):
+        if isinstance(result, CRMUnavailable):
+            failed.append(phone)
+        elif isinstance(result, BaseException):
+            raise result
+        elif result is not None:
+            found[phone] = result
+    return found, failed
+
 
+async def fetch_many(
+    phone_numbers: list[str],
+    concurrency: int,
+    queue_wait: float | None = None,
+) -> dict[str, CRMProfile]:
+    """`lookup_many` without the failures: numbers the CRM couldn't answer are just absent."""
+    found, _ = await lookup_many(phone_numbers, concurrency, queue_wait)
+    return found
+
+
+async def list_numbers(cursor: str | None, limit: int) -> tuple[list[str], str | None]:
+    """
+    Fetch one page from CRM_LIST_URL. The endpoint takes `cursor`/`limit`
+    query params and returns `{"items": [...], "next": <cursor or null>}`
+    (or a bare list for a single page); items are numbers or profile objects.
+    """
+    if not settings.crm_list_url:
+        return [], None
+    headers: dict[str, str] = {}
+    if settings.crm_api_token:
+        headers["Authorization"] = f"Bearer {settings.crm_api_token}"
+    params = {"limit": str(limit)}
+    if cursor is not None:
+        params["cursor"] = cursor
+
+    response = await _get(settings.crm_list_url, params, headers, queue_wait=math.inf)
+    response.raise_for_status()
+    payload: Any = response.json()
+    items = payload if isinstance(payload, list) else payload.get("items", [])
+    next_cursor = None if isinstance(payload, list) else payload.get("next")
+
+    numbers: list[str] = []
+    for item in items:
+        if isinstance(item, dict):
+            item = item.get("phone_number") or item.get("phone")
+        if isinstance(item, str) and item:
+            numbers.append(item)
+    return numbers, (str(next_cursor) if next_cursor is not None else None)
+
+
+async def _lookup(base_url: str, phone_number: str, queue_wait: float | None) -> CRMProfile | None:
     headers: dict[str, str] = {}
     if settings.crm_api_token:
         headers["Authorization"] = f"Bearer {settings.crm_api_token}"
@@ -50,19 +296,35 @@ async def fetch_profile(phone_number: str) -> CRMProfile | None:
         params = {"phone": phone_number}
 
     try:
-        async with httpx.AsyncClient(timeout=settings.crm_timeout_seconds) as client:
-            response = await client.get(url, params=params, headers=headers)
-    except httpx.HTTPError:
-        return None
+        response = await _get(url, params, headers, queue_wait)
+    except Shed:
+        # Overload on our side, not a CRM failure: no breaker or negative-cache entry.
+        breaker.release_trial()
+        raise CRMUnavailable("shed") from None
+    except httpx.HTTPError as exc:
+        breaker.record_failure()
+        CRM_ERRORS.inc("transport")
+        raise CRMUnavailable("transport error") from exc
 
-    if response.status_code == 404:
+    if response.status_code >= 500:
+        breaker.record_failure()
+        CRM_ERRORS.inc("status_5xx")
+        raise CRMUnavailable(f"status {response.status_code}")
+    breaker.record_success()
+
+    if response.status_code in (400, 404, 422):
+        negative_cache.set(phone_number, True)
         return None
     if response.status_code >= 400:
-        return None
+        # 401/403/429...: not an answer about this number.
+        CRM_ERRORS.inc("status_4xx")
+        raise CRMUnavailable(f"status {response.status_code}")
 
     try:
         payload: Any = response.json()
     except ValueError:
+        negative_cache.set(phone_number, True)
+        CRM_ERRORS.inc("invalid_payload")
         return None
 
     if isinstance(payload, dict) and "profile" in payload and isinstance(payload["profile"], dict):
@@ -77,4 +339,6 @@ async def fetch_profile(phone_number: str) -> CRMProfile | None:
     try:
         return CRMProfile.model_validate(payload)
     except ValidationError:
-        return None
+        negative_cache.set(phone_number, True)
+        CRM_ERRORS.inc("invalid_payload")
+        return None
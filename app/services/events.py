@@ -0,0 +1,192 @@
+"""
+Call-event log for analytics.
+
+Webhooks call `record(...)`, which only puts the event on a bounded queue, so
+a turn never waits on the database. A background writer inserts queued events
+into `call_events` in batches of up to CALL_EVENTS_BATCH_SIZE, flushing at
+least every CALL_EVENTS_FLUSH_INTERVAL_SECONDS. When the queue is full (the
+writer can't keep up), new events are dropped and counted. `shutdown` drains
+and flushes whatever is left.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import case, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models import CallEvent, CallEventSummary
+from app.utils import timing
+from app.utils.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("db", "crm", "lang_detect", "llm", "twiml")
+
+EVENTS_WRITTEN = Counter("call_events_written_total", "Call events inserted into call_events.")
+EVENTS_DROPPED = Counter("call_events_dropped_total", "Call events lost, by reason.", ("reason",))
+
+_WRITE_ATTEMPTS = 3
+_STOP: dict[str, Any] = {}  # queued by shutdown after the last event
+
+_queue: asyncio.Queue[dict[str, Any]] | None = None
+_writer: asyncio.Task | None = None
+
+
+def queue_depth() -> int:
+    return _queue.qsize() if _queue is not None else 0
+
+
+def record(
+    kind: str,
+    call_sid: str,
+    phone_number: str,
+    language_code: str,
+    voice: str,
+    profile_found: bool,
+    utterance: str = "",
+    reply_source: str | None = None,
+) -> None:
+    """Queue an event for the current request; stage timings are taken from `app.utils.timing`."""
+    if _queue is None:
+        return
+    stages, elapsed = timing.current() or ({}, 0.0)
+    event = {
+        "created_at": datetime.utcnow(),
+        "call_sid": call_sid,
+        "phone_number": phone_number,
+        "kind": kind,
+        "language_code": language_code,
+        "voice": voice,
+        "profile_found": profile_found,
+        "utterance_chars": len(utterance),
+        "reply_source": reply_source,
+        "latency_ms": elapsed * 1000,
+        **{f"{name}_ms": stages.get(name, 0.0) * 1000 for name in STAGES},
+    }
+    try:
+        _queue.put_nowait(event)
+    except asyncio.QueueFull:
+        EVENTS_DROPPED.inc("queue_full")
+
+
+async def _write(batch: list[dict[str, Any]]) -> None:
+    for attempt in range(1, _WRITE_ATTEMPTS + 1):
+        try:
+            async with SessionLocal() as db:
+                await db.execute(insert(CallEvent), batch)
+                await db.commit()
+            EVENTS_WRITTEN.inc(amount=len(batch))
+            return
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            if attempt == _WRITE_ATTEMPTS:
+                logger.exception("Dropping %d call events after %d failed writes", len(batch), attempt)
+                EVENTS_DROPPED.inc("write_error", amount=len(batch))
+                return
+            await asyncio.sleep(0.1 * 2 ** attempt)
+
+
+async def _run(queue: asyncio.Queue[dict[str, Any]]) -> None:
+    batch_size = settings.call_events_batch_size
+    interval = settings.call_events_flush_interval_seconds
+    stopping = False
+    while not stopping:
+        first = await queue.get()
+        if first is _STOP:
+            return
+        batch = [first]
+        deadline = time.monotonic() + interval
+        while len(batch) < batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            if event is _STOP:
+                stopping = True
+                break
+            batch.append(event)
+        await _write(batch)
+
+
+def start() -> None:
+    global _queue, _writer
+    if not settings.call_events_enabled or _writer is not None:
+        return
+    _queue = asyncio.Queue(maxsize=settings.call_events_queue_size)
+    _writer = asyncio.create_task(_run(_queue))
+
+
+async def shutdown() -> None:
+    """Stop the writer and flush everything still queued."""
+    global _queue, _writer
+    if _writer is None or _queue is None:
+        return
+    queue, _queue = _queue, None  # stop accepting events
+    await queue.put(_STOP)  # the writer flushes everything queued before it
+    await _writer
+    _writer = None
+
+
+async def summary(db: AsyncSession, since: datetime | None = None) -> list[CallEventSummary]:
+    """
+    Per-language volume, latency and reply sources since `since` (default:
+    the last 24h). Latencies are for /voice/handle turns, except
+    `avg_incoming_latency_ms`.
+    """
+    since = since or datetime.utcnow() - timedelta(hours=24)
+    window = CallEvent.created_at >= since
+    is_turn = CallEvent.kind == "turn"
+
+    def turn_only(column: Any) -> Any:
+        return case((is_turn, column))  # NULL for other kinds, which AVG/MAX skip
+
+    res = await db.execute(
+        select(
+            CallEvent.language_code,
+            func.count(func.distinct(CallEvent.call_sid)),
+            func.count(turn_only(CallEvent.id)),
+            func.avg(turn_only(CallEvent.latency_ms)),
+            func.max(turn_only(CallEvent.latency_ms)),
+            func.avg(case((~is_turn, CallEvent.latency_ms))),
+            *(func.avg(turn_only(getattr(CallEvent, f"{name}_ms"))) for name in STAGES),
+        )
+        .where(window)
+        .group_by(CallEvent.language_code)
+        .order_by(func.count().desc())
+    )
+    rows = res.all()
+
+    sources: dict[str, dict[str, int]] = {}
+    res = await db.execute(
+        select(CallEvent.language_code, CallEvent.reply_source, func.count())
+        .where(window, CallEvent.reply_source.is_not(None))
+        .group_by(CallEvent.language_code, CallEvent.reply_source)
+    )
+    for language, source, count in res.all():
+        sources.setdefault(language, {})[source] = count
+
+    return [
+        CallEventSummary(
+            language_code=language,
+            calls=calls,
+            turns=turns,
+            avg_latency_ms=avg_latency or 0.0,
+            max_latency_ms=max_latency or 0.0,
+            avg_incoming_latency_ms=avg_incoming or 0.0,
+            avg_stage_ms={name: value or 0.0 for name, value in zip(STAGES, stage_avgs)},
+            reply_sources=sources.get(language, {}),
+        )
+        for language, calls, turns, avg_latency, max_latency, avg_incoming, *stage_avgs in rows
+    ]
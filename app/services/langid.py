@@ -0,0 +1,133 @@
+"""
+Language identification for caller utterances.
+
+Scripts with a single likely language are recognised from Unicode ranges
+without touching a statistical model. Devanagari is split between Hindi and
+Marathi by common function words. Only Latin and other ambiguous text goes to
+langdetect, which is seeded (deterministic), restricted to LANGID_LANGUAGES
+and can be preloaded at startup.
+Results for short utterances are memoized.
+"""
+
+from __future__ import annotations
+
+import threading
+from functools import lru_cache
+from typing import Iterable
+
+from app.config import settings
+from app.utils.timing import stage
+
+# (first code point, last code point, ISO 639-1 code or "deva" for Devanagari)
+_SCRIPT_RANGES = (
+    (0x0900, 0x097F, "deva"),
+    (0x0980, 0x09FF, "bn"),
+    (0x0A00, 0x0A7F, "pa"),
+    (0x0A80, 0x0AFF, "gu"),
+    (0x0B00, 0x0B7F, "or"),
+    (0x0B80, 0x0BFF, "ta"),
+    (0x0C00, 0x0C7F, "te"),
+    (0x0C80, 0x0CFF, "kn"),
+    (0x0D00, 0x0D7F, "ml"),
+)
+
+_MARATHI_WORDS = frozenset(
+    "आहे आहेत नाही मला तुम्ही आम्ही काय कसे माझा माझे माझी आणि पाहिजे हवे होते केले बोला तुमचा आपला".split()
+)
+_HINDI_WORDS = frozenset(
+    "है हैं नहीं मुझे मैं क्या कैसे मेरा मेरे मेरी और चाहिए करें था थे हूँ हूं में".split()
+)
+
+_model_loaded = False
+_model_lock = threading.Lock()
+
+
+def _load_model() -> None:
+    # langdetect is imported lazily: it loads ~50 language profiles on first use.
+    # Locked: warm-up loads it in a thread while requests may already need it,
+    # and langdetect publishes its factory before the profiles are loaded.
+    global _model_loaded
+    if _model_loaded:
+        return
+    with _model_lock:
+        if _model_loaded:
+            return
+        from langdetect import DetectorFactory
+        from langdetect.detector_factory import init_factory
+
+        DetectorFactory.seed = 0
+        init_factory()
+        _model_loaded = True
+
+
+def warm() -> None:
+    """Load the statistical model now instead of on the first live call."""
+    _load_model()
+    detect("hello")
+
+
+def _script_of(text: str) -> str | None:
+    for ch in text:
+        cp = ord(ch)
+        if cp < 0x0900:
+            continue
+        for start, end, code in _SCRIPT_RANGES:
+            if start <= cp <= end:
+                return code
+    return None
+
+
+def _statistical(text: str) -> str | None:
+    _load_model()
+    from langdetect import detector_factory
+    from langdetect.lang_detect_exception import LangDetectException
+
+    # Only consider the languages we can serve (e.g. no "af" for short English).
+    languages = [code.strip() for code in settings.langid_languages.split(",") if code.strip()]
+    try:
+        detector = detector_factory._factory.create()
+        if languages:
+            detector.set_prior_map({code: 1.0 for code in languages})
+        detector.append(text)
+        return detector.detect()
+    except LangDetectException:
+        return None
+
+
+def _devanagari(text: str) -> str | None:
+    words = text.split()
+    marathi = sum(w in _MARATHI_WORDS for w in words)
+    hindi = sum(w in _HINDI_WORDS for w in words)
+    if marathi != hindi:
+        return "mr" if marathi > hindi else "hi"
+    guess = _statistical(text)
+    return guess if guess in ("hi", "mr") else "hi"
+
+
+def _detect(text: str) -> str | None:
+    script = _script_of(text)
+    if script == "deva":
+        return _devanagari(text)
+    if script is not None:
+        return script
+    return _statistical(text)
+
+
+@lru_cache(maxsize=4096)
+def _detect_memo(text: str) -> str | None:
+    return _detect(text)
+
+
+def detect(text: str) -> str | None:
+    """Return an ISO 639-1 code for `text`, or None if it can't be identified."""
+    text = (text or "").strip()
+    if not text:
+        return None
+    with stage("lang_detect"):
+        if len(text) <= settings.langid_memo_max_chars:
+            return _detect_memo(text)
+        return _detect(text)
+
+
+def detect_many(texts: Iterable[str]) -> list[str | None]:
+    return [detect(t) for t in texts]
@@ -0,0 +1,256 @@
+"""
+Media Streams pipeline: one `MediaStreamCall` per /voice/stream WebSocket.
+
+    receive --frames--> recognize --final transcript--> turn (LLM, TTS) --frames--> send
+            (audio_in)                                                 (audio_out)
+
+Twilio sends the caller's audio as 20 ms mu-law frames in JSON "media"
+messages. The receiver never blocks on them: if recognition falls behind and
+`audio_in` is full, the oldest frame is dropped and counted, since stale audio
+is worthless. Reply audio flows back through `audio_out`, which the sender
+drains no faster than playback plus STREAM_PLAYBACK_LEAD_MS, so a full queue
+pauses TTS instead of buffering the whole reply.
+
+Barge-in: when the caller starts speaking while a reply is being generated or
+played, the reply task is cancelled (which stops the LLM and TTS calls),
+queued audio is discarded and Twilio is told to `clear` what it has buffered.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from base64 import b64decode, b64encode
+from typing import Any, AsyncIterator
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from app.config import settings
+from app.services import asr
+from app.services import conversation
+from app.services import events
+from app.services import nlp
+from app.services import sessions
+from app.services import tts
+from app.utils import mulaw, timing
+from app.utils.metrics import Counter, Histogram
+from app.utils.timing import stage
+
+logger = logging.getLogger(__name__)
+
+ROUTE = "/voice/stream"
+FRAME_SECONDS = mulaw.FRAME_BYTES / mulaw.SAMPLE_RATE
+
+RESPONSE_SECONDS = Histogram(
+    "media_stream_response_seconds",
+    "Seconds from the caller's final transcript to the first frame of reply audio.",
+)
+BARGE_INS = Counter("media_stream_barge_ins_total", "Replies cut off because the caller spoke over them.")
+FRAMES_DROPPED = Counter("media_stream_frames_dropped_total", "Caller audio frames dropped because recognition fell behind.")
+
+_END_OF_REPLY = b""  # queued after a reply's last frame; sent to Twilio as a mark
+
+_active: set["MediaStreamCall"] = set()
+
+
+def available() -> bool:
+    return settings.media_streams_enabled and asr.available() and tts.synthesizer is not None
+
+
+def active() -> int:
+    return len(_active)
+
+
+class MediaStreamCall:
+    def __init__(self, websocket: WebSocket) -> None:
+        self.websocket = websocket
+        self.stream_sid = ""
+        self.call_sid = ""
+        self.session: sessions.CallSession | None = None
+        self._messages = self._receive_messages()
+        self._recognizer: asr.StreamingRecognizer | None = None
+        self._audio_in: asyncio.Queue[bytes] = asyncio.Queue(maxsize=settings.stream_in_queue_frames)
+        self._audio_out: asyncio.Queue[tuple[int, bytes]] = asyncio.Queue(maxsize=settings.stream_out_queue_frames)
+        self._send_lock = asyncio.Lock()
+        self._reply: asyncio.Task | None = None
+        self._epoch = 0  # bumped per reply and per barge-in; queued frames of older epochs are skipped
+        self._answered_epoch = 0
+        self._heard_at = 0.0  # when the transcript being answered arrived
+        self._playing_until = 0.0  # when the audio sent so far finishes playing
+        self._unplayed_mark: str | None = None  # mark Twilio hasn't echoed yet: the reply is still playing
+
+    @property
+    def language_code(self) -> str:
+        return self.session.language_code if self.session else settings.default_language
+
+    @property
+    def gender(self) -> str:
+        return self.session.gender if self.session else settings.default_gender
+
+    @property
+    def _busy(self) -> bool:
+        replying = self._reply is not None and not self._reply.done()
+        return replying or not self._audio_out.empty() or self._unplayed_mark is not None
+
+    async def run(self) -> None:
+        if not await self._start():
+            return
+        _active.add(self)
+        tasks = [
+            asyncio.create_task(self._receive()),
+            asyncio.create_task(self._recognize()),
+            asyncio.create_task(self._send()),
+        ]
+        try:
+            # Whichever stage ends first (normally the receiver, on "stop" or a
+            # disconnect) ends the call.
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    logger.error("Media stream %s failed", self.call_sid, exc_info=task.exception())
+        finally:
+            _active.discard(self)
+            self._cancel_reply()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, *(t for t in [self._reply] if t), return_exceptions=True)
+
+    async def _receive_messages(self) -> AsyncIterator[dict[str, Any]]:
+        try:
+            while True:
+                yield json.loads(await self.websocket.receive_text())
+        except WebSocketDisconnect:
+            return
+
+    async def _start(self) -> bool:
+        # Twilio sends "connected" then "start", which carries the CallSid.
+        async for message in self._messages:
+            if message.get("event") != "start":
+                continue
+            start = message.get("start") or {}
+            self.stream_sid = message.get("streamSid") or start.get("streamSid", "")
+            self.call_sid = start.get("callSid", "")
+            self.session = await sessions.store.get(self.call_sid) if self.call_sid else None
+            self._recognizer = asr.recognizer(self.language_code)
+            return self._recognizer is not None
+        return False
+
+    async def _receive(self) -> None:
+        async for message in self._messages:
+            event = message.get("event")
+            if event == "media":
+                media = message.get("media") or {}
+                if media.get("track", "inbound") == "inbound":
+                    self._put_frame(b64decode(media.get("payload", "")))
+            elif event == "mark":
+                if (message.get("mark") or {}).get("name") == self._unplayed_mark:
+                    self._unplayed_mark = None
+            elif event == "stop":
+                return
+
+    def _put_frame(self, frame: bytes) -> None:
+        if self._audio_in.full():
+            self._audio_in.get_nowait()
+            FRAMES_DROPPED.inc()
+        self._audio_in.put_nowait(frame)
+
+    async def _recognize(self) -> None:
+        assert self._recognizer is not None
+        while True:
+            frame = await self._audio_in.get()
+            for transcript in await self._recognizer.feed(frame):
+                if self._busy:
+                    await self._barge_in()
+                if transcript.final and transcript.text:
+                    self._heard_at = time.monotonic()
+                    self._epoch += 1
+                    self._reply = asyncio.create_task(self._turn(transcript.text, self._epoch))
+
+    async def _barge_in(self) -> None:
+        BARGE_INS.inc()
+        self._cancel_reply()
+        self._epoch += 1
+        while not self._audio_out.empty():
+            self._audio_out.get_nowait()
+        self._playing_until = 0.0
+        self._unplayed_mark = None
+        await self._send_json({"event": "clear", "streamSid": self.stream_sid})
+
+    def _cancel_reply(self) -> None:
+        if self._reply is not None and not self._reply.done():
+            self._reply.cancel()
+
+    async def _turn(self, utterance: str, epoch: int) -> None:
+        timing.begin()
+        try:
+            name = self.session.name if self.session else None
+            history = await conversation.store.history(self.call_sid)
+            reply = await nlp.generate_reply_within(utterance, language_code=self.language_code, name=name, history=history)
+            await conversation.store.append(self.call_sid, conversation.Turn(utterance, reply.text))
+            chunks = tts.stream(reply.text, self.language_code, self.gender).__aiter__()
+            with stage("tts"):
+                chunk = await anext(chunks, None)
+            self._record(utterance, reply.source)
+            pending = b""
+            while chunk is not None:
+                pending += chunk
+                while len(pending) >= mulaw.FRAME_BYTES:
+                    await self._audio_out.put((epoch, pending[: mulaw.FRAME_BYTES]))
+                    pending = pending[mulaw.FRAME_BYTES:]
+                chunk = await anext(chunks, None)
+            if pending:
+                await self._audio_out.put((epoch, pending.ljust(mulaw.FRAME_BYTES, bytes([mulaw.SILENCE]))))
+            await self._audio_out.put((epoch, _END_OF_REPLY))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Media stream turn failed for call %s", self.call_sid)
+        finally:
+            timing.end(ROUTE)
+
+    def _record(self, utterance: str, reply_source: str) -> None:
+        session = self.session
+        events.record(
+            "turn",
+            self.call_sid,
+            session.phone if session else "",
+            self.language_code,
+            tts.synthesizer.voice_for(self.language_code, self.gender) if tts.synthesizer else "",
+            profile_found=bool(session and session.profile_id is not None),
+            utterance=utterance,
+            reply_source=reply_source,
+        )
+
+    async def _send(self) -> None:
+        lead = settings.stream_playback_lead_ms / 1000
+        while True:
+            epoch, frame = await self._audio_out.get()
+            if epoch != self._epoch:
+                continue
+            if not frame:  # _END_OF_REPLY
+                # Twilio echoes the mark once everything before it has played.
+                self._unplayed_mark = f"reply-{epoch}"
+                await self._send_json({"event": "mark", "streamSid": self.stream_sid, "mark": {"name": self._unplayed_mark}})
+                continue
+            ahead = self._playing_until - time.monotonic()
+            if ahead > lead:
+                await asyncio.sleep(ahead - lead)
+                if epoch != self._epoch:
+                    continue
+            now = time.monotonic()
+            if epoch != self._answered_epoch:
+                self._answered_epoch = epoch
+                RESPONSE_SECONDS.observe(now - self._heard_at)
+            self._playing_until = max(self._playing_until, now) + FRAME_SECONDS
+            await self._send_json({
+                "event": "media",
+                "streamSid": self.stream_sid,
+                "media": {"payload": b64encode(frame).decode("ascii")},
+            })
+
+    async def _send_json(self, message: dict[str, Any]) -> None:
+        # The sender and barge-in both write to the socket.
+        async with self._send_lock:
+            await self.websocket.send_text(json.dumps(message))
@@ -1,44 +1,293 @@
 from __future__ import annotations
 
-from typing import Optional
+import asyncio
+import importlib.util
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Optional, Sequence
 
-try:
+from app.config import settings
+from app.services.conversation import Turn
+from app.services.reply_cache import reply_cache
+from app.utils.admission import Limiter, Shed
+from app.utils import metrics
+from app.utils.metrics import LLM_ERRORS
+from app.utils.timing import stage
+
+if TYPE_CHECKING:
     from openai import AsyncOpenAI
-except Exception:  # pragma: no cover - optional
-    AsyncOpenAI = None  # type: ignore
 
-from app.config import settings
+logger = logging.getLogger(__name__)
 
+# Per-language templates used when no LLM is configured or it misses the deadline.
+FALLBACK_REPLIES = {
+    "en": "Thanks for calling. How can I help you today?",
+    "hi": "फोन करने के लिए धन्यवाद। मैं आपकी कैसे मदद कर सकता/सकती हूँ?",
+    "mr": "फोन केल्याबद्दल धन्यवाद. मी तुम्हाला कशी मदत करू?",
+}
 
-async def generate_reply(user_utterance: str, language_code: str, name: Optional[str] = None) -> str:
+# End of a sentence: ., !, ?, or the Devanagari danda, followed by space or end.
+_SENTENCE_END = re.compile(r"[.!?।॥]+(?=\s|$)")
+
+PROMPT_TOKENS = metrics.Histogram(
+    "llm_prompt_tokens",
+    "Estimated prompt tokens per LLM call.",
+    buckets=(50, 100, 200, 300, 400, 600, 800, 1200, 1600, 3200),
+)
+HISTORY_SUMMARIZED = metrics.Counter(
+    "llm_history_turns_summarized_total",
+    "Earlier turns of a call condensed into the prompt summary to stay within LLM_PROMPT_TOKEN_BUDGET.",
+)
+
+_MESSAGE_OVERHEAD = 4  # tokens of chat framing per message
+_SUMMARY_WORDS = 12  # per earlier utterance
+
+# How each turn was served: cache, llm, llm_truncated, fallback or shed.
+reply_sources: Counter[str] = Counter()
+
+# Admission control for LLM calls (LLM_MAX_IN_FLIGHT per worker); turns that
+# can't get a slot in time are answered with the template (source "shed").
+limiter = Limiter(
+    "llm",
+    limit=settings.llm_max_in_flight,
+    queue_wait=settings.llm_queue_wait_seconds,
+    max_queue=settings.llm_max_queue,
+)
+
+
+@dataclass
+class Reply:
+    text: str
+    source: str
+
+
+_client: Optional["AsyncOpenAI"] = None
+
+
+@lru_cache(maxsize=1)
+def llm_configured() -> bool:
+    # Checked without importing openai, which takes about a quarter of a
+    # second; the import happens in `warm()` or on the first LLM turn.
+    return bool(settings.openai_api_key) and importlib.util.find_spec("openai") is not None
+
+
+def get_client() -> "AsyncOpenAI":
+    # One client per process so the underlying HTTP connection pool is reused.
+    global _client
+    if _client is None:
+        from openai import AsyncOpenAI
+
+        _client = AsyncOpenAI(api_key=settings.openai_api_key)
+    return _client
+
+
+def warm() -> None:
+    """Import openai and build the client now rather than on the first LLM turn."""
+    if llm_configured():
+        get_client()
+
+
+def fallback_reply(language_code: str) -> str:
+    return FALLBACK_REPLIES.get(language_code.split("-")[0], FALLBACK_REPLIES["en"])
+
+
+def cut_at_sentence(text: str) -> str:
+    """Return `text` up to its last complete sentence ('' if there is none)."""
+    last = None
+    for last in _SENTENCE_END.finditer(text):
+        pass
+    return text[: last.end()].strip() if last else ""
+
+
+def estimate_tokens(text: str) -> int:
+    # About 4 bytes of UTF-8 per token for English; errs high for Devanagari,
+    # which is the safe side for a budget. Avoids a tokenizer dependency.
+    return len(text.encode("utf-8")) // 4 + 1
+
+
+def _summarize(turns: Sequence[Turn], budget: int) -> str:
+    """What the caller said in `turns`, newest first, abbreviated to fit `budget` tokens ('' if nothing fits)."""
+    summary = "Earlier in this call the caller said:"
+    spent = estimate_tokens(summary)
+    said = []
+    for turn in reversed(turns):
+        words = turn.utterance.split()
+        quote = '"' + " ".join(words[:_SUMMARY_WORDS]) + ("..." if len(words) > _SUMMARY_WORDS else "") + '"'
+        cost = estimate_tokens(quote)
+        if spent + cost > budget:
+            break
+        said.append(quote)
+        spent += cost
+    return f"{summary} {'; '.join(said)}." if said else ""
+
+
+def build_messages(
+    user_utterance: str,
+    language_code: str,
+    name: Optional[str],
+    history: Sequence[Turn] = (),
+) -> list[dict[str, str]]:
     """
-    Generate a reply. If OpenAI key is configured, use LLM; otherwise return a simple template.
+    Chat messages for this turn. The newest `history` turns are included
+    verbatim while they fit in LLM_PROMPT_TOKEN_BUDGET; older ones are
+    condensed into a summary of what the caller said, or dropped.
     """
-    if settings.openai_api_key and AsyncOpenAI is not None:
-        client = AsyncOpenAI(api_key=settings.openai_api_key)
-        sys = (
-            "You are a concise, friendly customer-care assistant. "
-            "Answer in the same language as the user. Be helpful and brief."
-        )
-        name_part = f" The caller's name is {name}." if name else ""
-        prompt = (
-            f"Language hint: {language_code}. {name_part} "
-            f"User said: {user_utterance}"
-        )
-        resp = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "system", "content": sys}, {"role": "user", "content": prompt}],
-            max_tokens=120,
-            temperature=0.3,
-        )
-        return resp.choices[0].message.content or ""
-    # Fallback rule-based reply
-    return (
-        {
-            "en": "Thanks for calling. How can I help you today?",
-            "hi": "फोन करने के लिए धन्यवाद। मैं आपकी कैसे मदद कर सकता/सकती हूँ?",
-            "mr": "फोन केल्याबद्दल धन्यवाद. मी तुम्हाला कशी मदत करू?",
-        }
-        .get(language_code.split("-")[0], "Thanks for calling. How can I help you today?")
+    sys = (
+        "You are a concise, friendly customer-care assistant. "
+        "Answer in the same language as the user. Be helpful and brief."
+    )
+    name_part = f" The caller's name is {name}." if name else ""
+    prompt = (
+        f"Language hint: {language_code}. {name_part} "
+        f"User said: {user_utterance}"
+    )
+    budget = settings.llm_prompt_token_budget - estimate_tokens(sys) - estimate_tokens(prompt) - 2 * _MESSAGE_OVERHEAD
+
+    recent: list[dict[str, str]] = []
+    older = list(history)
+    while older:
+        turn = older[-1]
+        cost = estimate_tokens(turn.utterance) + estimate_tokens(turn.reply) + 2 * _MESSAGE_OVERHEAD
+        if cost > budget:
+            break
+        budget -= cost
+        older.pop()
+        recent[:0] = [{"role": "user", "content": turn.utterance}, {"role": "assistant", "content": turn.reply}]
+    if older:
+        HISTORY_SUMMARIZED.inc(amount=len(older))
+        summary = _summarize(older, budget)
+        if summary:
+            sys = f"{sys} {summary}"
+    return [{"role": "system", "content": sys}, *recent, {"role": "user", "content": prompt}]
+
+
+async def _stream_into(
+    parts: list[str],
+    user_utterance: str,
+    language_code: str,
+    name: Optional[str],
+    history: Sequence[Turn],
+) -> None:
+    messages = build_messages(user_utterance, language_code, name, history)
+    PROMPT_TOKENS.observe(sum(estimate_tokens(m["content"]) + _MESSAGE_OVERHEAD for m in messages))
+    stream = await get_client().chat.completions.create(
+        model="gpt-4o-mini",
+        messages=messages,
+        max_tokens=120,
+        temperature=0.3,
+        stream=True,
     )
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+
+
+async def _generate(
+    user_utterance: str,
+    language_code: str,
+    name: Optional[str],
+    budget: Optional[float],
+    history: Sequence[Turn] = (),
+    on_llm_call: Optional[Callable[[], None]] = None,
+) -> Reply:
+    if not llm_configured():
+        return Reply(fallback_reply(language_code), "fallback")
+
+    # A cached reply answers the utterance alone, not the conversation so far.
+    cacheable = not history
+    cached = await reply_cache.get(user_utterance, language_code, name) if cacheable else None
+    if cached is not None:
+        return Reply(cached, "cache")
+
+    # Queueing for a slot spends part of the reply budget.
+    queue_wait = settings.llm_queue_wait_seconds if budget is None else min(settings.llm_queue_wait_seconds, budget)
+    try:
+        waited = await limiter.acquire(queue_wait)
+    except Shed:
+        return Reply(fallback_reply(language_code), "shed")
+    if on_llm_call is not None:
+        on_llm_call()
+
+    # Tokens land in `parts` as they stream, so whatever arrived before the
+    # deadline is still usable after the consumer is cancelled.
+    parts: list[str] = []
+    complete = False
+    try:
+        remaining = None if budget is None else budget - waited
+        await asyncio.wait_for(_stream_into(parts, user_utterance, language_code, name, history), timeout=remaining)
+        complete = True
+    except asyncio.TimeoutError:
+        LLM_ERRORS.inc("timeout")
+    except Exception:
+        LLM_ERRORS.inc("error")
+        logger.exception("LLM reply failed")
+    finally:
+        limiter.release()
+
+    text = "".join(parts).strip()
+    if complete and text:
+        if cacheable:
+            await reply_cache.set(user_utterance, language_code, name, text)
+        return Reply(text, "llm")
+    partial = cut_at_sentence(text)
+    if partial:
+        return Reply(partial, "llm_truncated")
+    return Reply(fallback_reply(language_code), "fallback")
+
 
+async def generate_reply_within(
+    user_utterance: str,
+    language_code: str,
+    name: Optional[str] = None,
+    budget: Optional[float] = None,
+    history: Sequence[Turn] = (),
+) -> Reply:
+    """
+    Deadline-aware reply to the latest turn of a call whose earlier turns
+    are `history`. Streams from the LLM for at most `budget` seconds
+    (LLM_REPLY_BUDGET_SECONDS by default); on timeout the reply is cut at the
+    last complete sentence, or replaced by the language template if nothing
+    usable arrived. When the LLM is saturated and no slot frees up within
+    LLM_QUEUE_WAIT_SECONDS the template is used straight away. The returned
+    `source` records which of these happened.
+    """
+    with stage("llm"):
+        reply = await _generate(
+            user_utterance,
+            language_code,
+            name,
+            settings.llm_reply_budget_seconds if budget is None else budget,
+            history,
+        )
+    count_source(reply)
+    return reply
+
+
+async def speculate(
+    user_utterance: str,
+    language_code: str,
+    name: Optional[str] = None,
+    history: Sequence[Turn] = (),
+    on_llm_call: Optional[Callable[[], None]] = None,
+) -> Reply:
+    """
+    `generate_reply_within` for a transcript that may still change. Not
+    counted in `reply_sources` until the reply is used (`count_source`);
+    `on_llm_call` runs if the LLM is actually called.
+    """
+    return await _generate(user_utterance, language_code, name, settings.llm_reply_budget_seconds, history, on_llm_call)
+
+
+def count_source(reply: Reply) -> None:
+    reply_sources[reply.source] += 1
+
+
+async def generate_reply(user_utterance: str, language_code: str, name: Optional[str] = None) -> str:
+    """
+    Generate a reply. If OpenAI key is configured, use LLM (through the reply
+    cache, within the reply budget); otherwise return a simple template.
+    """
+    return (await generate_reply_within(user_utterance, language_code, name)).text
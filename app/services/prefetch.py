@@ -0,0 +1,72 @@
+"""
+Background CRM prefetch.
+
+`/voice/incoming` answers immediately with default personalization and starts
+the CRM lookup (plus the local upsert) here, so it runs while Twilio plays the
+<Gather> prompt. `/voice/handle` then picks up the result via `wait`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models import Customer
+from app.services import crm as crm_svc
+from app.services import profiles as prof_svc
+from app.utils import timing
+
+logger = logging.getLogger(__name__)
+
+_tasks: dict[str, asyncio.Task] = {}
+
+
+async def _fetch_and_store(phone: str) -> Customer | None:
+    timing.detach()
+    try:
+        external = await crm_svc.fetch_profile(phone)
+        if not external:
+            return None
+        async with SessionLocal() as db:
+            return await prof_svc.upsert_from_crm(
+                db,
+                external,
+                settings.default_language,
+                settings.default_gender,
+            )
+    except Exception:
+        logger.exception("CRM prefetch failed for %s", phone)
+        return None
+
+
+def start(phone: str) -> None:
+    """Start a prefetch for `phone` unless the CRM is disabled or one is already running."""
+    if not settings.crm_api_base_url or not phone or phone in _tasks:
+        return
+    task = asyncio.create_task(_fetch_and_store(phone))
+    _tasks[phone] = task
+    task.add_done_callback(lambda _: _tasks.pop(phone, None))
+
+
+async def wait(phone: str, timeout: float | None = None) -> Customer | None:
+    """
+    Await a running prefetch for `phone`. Returns None when there is none (it
+    may already have finished, in which case the profile is in the DB/cache)
+    or when it doesn't finish within `timeout`.
+    """
+    task = _tasks.get(phone)
+    if task is None:
+        return None
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), timeout)
+    except asyncio.TimeoutError:
+        return None
+
+
+async def shutdown() -> None:
+    tasks = list(_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,11 +1,17 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Iterable
 
 from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.models import Customer, CustomerCreate, CustomerUpdate, GenderEnum
+from app.utils.cache import MISSING, TTLCache
+from app.utils.phone import to_e164
+from app.utils.timing import stage
 
 if TYPE_CHECKING:
     from app.services.crm import CRMProfile
@@ -20,14 +26,92 @@ def gender_from_string(value: str | None) -> GenderEnum | None:
         return None
 
 
+# Profile cache keyed by E.164 number. Values are column snapshots (or None for
+# "known absent") so cached data never holds on to a session-bound instance.
+_PROFILE_COLUMNS = ("id", "phone_number", "phone_e164", "name", "gender", "language_code", "created_at", "updated_at")
+
+profile_cache: TTLCache[str, tuple | None] = TTLCache(
+    maxsize=settings.profile_cache_size,
+    ttl=settings.profile_cache_ttl_seconds,
+)
+
+
+def _snapshot(obj: Customer) -> tuple:
+    return tuple(getattr(obj, col) for col in _PROFILE_COLUMNS)
+
+
+def _from_snapshot(snapshot: tuple) -> Customer:
+    # A fresh transient instance per hit, so callers can't mutate the cached copy.
+    return Customer(**dict(zip(_PROFILE_COLUMNS, snapshot)))
+
+
+def cache_store(obj: Customer) -> None:
+    profile_cache.set(obj.phone_e164 or to_e164(obj.phone_number), _snapshot(obj))
+
+
+def cache_invalidate(phone: str) -> None:
+    profile_cache.pop(to_e164(phone))
+
+
 async def get_by_phone(db: AsyncSession, phone: str) -> Customer | None:
-    res = await db.execute(select(Customer).where(Customer.phone_number == phone))
-    return res.scalar_one_or_none()
+    """
+    Cached read. The returned instance is detached from `db`; use it for reads
+    only and go through `update`/`upsert_from_crm` for writes. Any formatting
+    of the number is accepted; lookups go by its E.164 form.
+    """
+    key = to_e164(phone)
+    cached = profile_cache.get(key)
+    if cached is not MISSING:
+        return _from_snapshot(cached) if cached is not None else None
+
+    with stage("db"):
+        res = await db.execute(select(Customer).where(Customer.phone_e164 == key))
+    obj = res.scalar_one_or_none()
+    if obj is None:
+        profile_cache.set(key, None, ttl=settings.profile_cache_negative_ttl_seconds)
+    else:
+        cache_store(obj)
+    return obj
+
+
+async def get_many_by_phone(db: AsyncSession, phones: Iterable[str]) -> dict[str, Customer]:
+    """
+    Cached batch read: numbers not in the cache are resolved with chunked
+    `IN` queries on the indexed phone_e164 column. The result is keyed by the
+    numbers as given; missing numbers are simply absent from it.
+    """
+    requested: dict[str, list[str]] = {}
+    for phone in dict.fromkeys(phones):
+        requested.setdefault(to_e164(phone), []).append(phone)
+
+    by_key: dict[str, Customer] = {}
+    pending: list[str] = []
+    for key in requested:
+        cached = profile_cache.get(key)
+        if cached is MISSING:
+            pending.append(key)
+        elif cached is not None:
+            by_key[key] = _from_snapshot(cached)
+
+    chunk = settings.profile_lookup_chunk_size
+    for start in range(0, len(pending), chunk):
+        batch = pending[start:start + chunk]
+        with stage("db"):
+            res = await db.execute(select(Customer).where(Customer.phone_e164.in_(batch)))
+        for obj in res.scalars():
+            by_key[obj.phone_e164] = obj
+            cache_store(obj)
+        for key in batch:
+            if key not in by_key:
+                profile_cache.set(key, None, ttl=settings.profile_cache_negative_ttl_seconds)
+    return {phone: obj for key, obj in by_key.items() for phone in requested[key]}
 
 
 async def create(db: AsyncSession, payload: CustomerCreate) -> Customer:
+    phone = to_e164(payload.phone_number)
     obj = Customer(
-        phone_number=payload.phone_number,
+        phone_number=phone,
+        phone_e164=phone,
         name=payload.name,
         gender=(payload.gender.value if payload.gender else None) or "neutral",
         language_code=payload.language_code or "en-US",
@@ -35,6 +119,7 @@ async def create(db: AsyncSession, payload: CustomerCreate) -> Customer:
     db.add(obj)
     await db.commit()
     await db.refresh(obj)
+    cache_store(obj)
     return obj
 
 
@@ -47,52 +132,133 @@ async def update(db: AsyncSession, obj: Customer, payload: CustomerUpdate) -> Cu
         obj.language_code = payload.language_code
     await db.commit()
     await db.refresh(obj)
+    cache_store(obj)
+    return obj
+
+
+# Dialect-specific INSERT constructs supporting ON CONFLICT ... RETURNING.
+_UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def _upsert_statement(db: AsyncSession, update_columns: Iterable[str]) -> Any:
+    """
+    INSERT ... ON CONFLICT(phone_e164) DO UPDATE for the session's dialect.
+    Only `update_columns` are overwritten on conflict; with none, the conflict
+    branch is a no-op update so RETURNING still yields the existing row.
+    """
+    dialect = db.get_bind().dialect.name
+    try:
+        insert = _UPSERT_INSERTS[dialect]
+    except KeyError:
+        raise RuntimeError(f"Profile upserts are not supported on {dialect!r}") from None
+    stmt = insert(Customer)
+    set_ = {col: stmt.excluded[col] for col in update_columns}
+    if set_:
+        set_["updated_at"] = datetime.utcnow()
+    else:
+        set_["phone_e164"] = stmt.excluded.phone_e164
+    return stmt.on_conflict_do_update(index_elements=[Customer.phone_e164], set_=set_)
+
+
+def _keyed(values: dict[str, Any]) -> dict[str, Any]:
+    # New rows store the canonical number; existing rows keep their original
+    # phone_number since it's never in the update columns.
+    phone = to_e164(values["phone_number"])
+    return {**values, "phone_number": phone, "phone_e164": phone}
+
+
+async def _upsert_one(db: AsyncSession, values: dict[str, Any], update_columns: Iterable[str]) -> Customer:
+    stmt = _upsert_statement(db, update_columns).values(**_keyed(values)).returning(Customer)
+    with stage("db"):
+        res = await db.execute(
+            select(Customer).from_statement(stmt).execution_options(populate_existing=True)
+        )
+        obj = res.scalar_one()
+        await db.commit()
+    cache_store(obj)
     return obj
 
 
+async def _upsert_many(db: AsyncSession, items: list[tuple[dict[str, Any], tuple[str, ...]]]) -> int:
+    # Items sharing the same value keys and update columns run as one executemany.
+    items = [(_keyed(values), update_columns) for values, update_columns in items]
+    groups: dict[tuple[tuple[str, ...], tuple[str, ...]], list[dict[str, Any]]] = {}
+    for values, update_columns in items:
+        groups.setdefault((tuple(sorted(values)), update_columns), []).append(values)
+    with stage("db"):
+        for (_, update_columns), group in groups.items():
+            await db.execute(_upsert_statement(db, update_columns), group)
+        await db.commit()
+    for values, _ in items:
+        profile_cache.pop(values["phone_e164"])
+    return len(items)
+
+
+async def bulk_upsert(db: AsyncSession, rows: list[dict[str, Any]]) -> int:
+    """
+    Upsert many profiles in one transaction. Each row overwrites only the keys
+    it provides; existing values are kept for the rest.
+    """
+    return await _upsert_many(
+        db,
+        [(row, tuple(sorted(k for k in row if k != "phone_number"))) for row in rows],
+    )
+
+
 async def get_or_create_default(db: AsyncSession, phone: str, default_language: str, default_gender: str) -> Customer:
     existing = await get_by_phone(db, phone)
     if existing:
         return existing
-    return await create(
+    # Atomic: a concurrent first call for the same number gets the same row.
+    return await _upsert_one(
         db,
-        CustomerCreate(phone_number=phone, gender=None, language_code=default_language),
+        {"phone_number": phone, "gender": GenderEnum.neutral.value, "language_code": default_language},
+        update_columns=(),
     )
 
 
-async def upsert_from_crm(
-    db: AsyncSession,
+def _crm_upsert_values(
     crm_profile: "CRMProfile",
     fallback_language: str,
     fallback_gender: str,
-) -> Customer:
-    phone = crm_profile.phone_number
-    existing = await get_by_phone(db, phone)
+) -> tuple[dict[str, Any], tuple[str, ...]]:
     language = crm_profile.normalized_language or fallback_language
     gender_enum = gender_from_string(crm_profile.normalized_gender)
-    gender_value = (gender_enum.value if gender_enum else fallback_gender) or fallback_gender
 
-    if existing:
-        if crm_profile.name:
-            existing.name = crm_profile.name
-        if gender_enum:
-            existing.gender = gender_enum.value
-        elif not existing.gender:
-            existing.gender = fallback_gender
-        existing.language_code = language or existing.language_code or fallback_language
-        await db.commit()
-        await db.refresh(existing)
-        return existing
+    # Existing rows keep their name/gender unless the CRM supplies one.
+    update_columns = ["language_code"]
+    if crm_profile.name:
+        update_columns.append("name")
+    if gender_enum:
+        update_columns.append("gender")
 
-    obj = Customer(
-        phone_number=phone,
-        name=crm_profile.name,
-        gender=gender_value or fallback_gender,
-        language_code=language or fallback_language,
-    )
-    db.add(obj)
-    await db.commit()
-    await db.refresh(obj)
-    return obj
+    values = {
+        "phone_number": crm_profile.phone_number,
+        "name": crm_profile.name,
+        "gender": gender_enum.value if gender_enum else fallback_gender,
+        "language_code": language,
+    }
+    return values, tuple(update_columns)
 
 
+async def upsert_from_crm(
+    db: AsyncSession,
+    crm_profile: "CRMProfile",
+    fallback_language: str,
+    fallback_gender: str,
+) -> Customer:
+    values, update_columns = _crm_upsert_values(crm_profile, fallback_language, fallback_gender)
+    return await _upsert_one(db, values, update_columns)
+
+
+async def upsert_many_from_crm(
+    db: AsyncSession,
+    crm_profiles: list["CRMProfile"],
+    fallback_language: str,
+    fallback_gender: str,
+) -> int:
+    """Batched `upsert_from_crm`: same merge rules, one transaction."""
+    return await _upsert_many(
+        db,
+        [_crm_upsert_values(p, fallback_language, fallback_gender) for p in crm_profiles],
+    )
@@ -0,0 +1,96 @@
+"""
+Cache for LLM replies.
+
+Keyed by (language base, normalized utterance, whether the caller's name is
+known). The caller's name is swapped for a placeholder before storing and
+substituted back after lookup, so "Thanks Asha" can be served to Ravi. Two
+tiers: an in-memory LRU per worker and an optional SQLite file shared by all
+workers (REPLY_CACHE_PATH).
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+
+from app.config import settings
+from app.utils.cache import TTLCache
+from app.utils.sqlite_kv import SQLiteKV
+
+_NAME_PLACEHOLDER = "\x00name\x00"
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_utterance(text: str) -> str:
+    # Casefold, drop punctuation (any script) and collapse whitespace.
+    text = "".join(" " if unicodedata.category(ch).startswith("P") else ch for ch in text.casefold())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def make_key(utterance: str, language_code: str, has_name: bool) -> str:
+    base = (language_code or "").split("-")[0].lower()
+    return f"{base}|{int(has_name)}|{normalize_utterance(utterance)}"
+
+
+def _templatize(reply: str, name: str) -> str:
+    # Whole words only: caller "Al" must not turn "Also" into "<name>so".
+    return re.sub(rf"(?<!\w){re.escape(name)}(?!\w)", lambda _: _NAME_PLACEHOLDER, reply)
+
+
+class ReplyCache:
+    def __init__(self) -> None:
+        self.memory: TTLCache[str, str] = TTLCache(
+            maxsize=settings.reply_cache_size,
+            ttl=settings.reply_cache_ttl_seconds,
+        )
+        self.persistent: SQLiteKV | None = None
+        if settings.reply_cache_path:
+            self.persistent = SQLiteKV(
+                settings.reply_cache_path,
+                "reply_cache",
+                maxsize=settings.reply_cache_persistent_size,
+                ttl=settings.reply_cache_persistent_ttl_seconds,
+            )
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    async def get(self, utterance: str, language_code: str, name: str | None) -> str | None:
+        if not settings.reply_cache_enabled:
+            return None
+        key = make_key(utterance, language_code, bool(name))
+        template = self.memory.get(key, None)
+        if template is not None:
+            self.memory_hits += 1
+        elif self.persistent is not None:
+            template = await self.persistent.get(key)
+            if template is not None:
+                self.persistent_hits += 1
+                self.memory.set(key, template)
+        if template is None:
+            self.misses += 1
+            return None
+        return template.replace(_NAME_PLACEHOLDER, name or "")
+
+    async def set(self, utterance: str, language_code: str, name: str | None, reply: str) -> None:
+        if not settings.reply_cache_enabled or not reply:
+            return
+        key = make_key(utterance, language_code, bool(name))
+        template = _templatize(reply, name) if name else reply
+        self.memory.set(key, template)
+        if self.persistent is not None:
+            await self.persistent.set(key, template)
+
+    def stats(self) -> dict[str, float]:
+        lookups = self.memory_hits + self.persistent_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_ratio": ((self.memory_hits + self.persistent_hits) / lookups) if lookups else 0.0,
+            "memory_size": len(self.memory),
+            "memory_evictions": self.memory.evictions,
+        }
+
+
+reply_cache = ReplyCache()
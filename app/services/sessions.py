@@ -0,0 +1,90 @@
+"""
+Per-call session state keyed by Twilio's CallSid.
+
+`/voice/incoming` resolves the caller once (DB, CRM, voice selection) and
+stores the result here so later `/voice/handle` turns of the same call can
+skip all lookups. The in-memory backend is per worker; the SQLite backend
+stores sessions in a file shared by every uvicorn worker on the host.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass
+from typing import Protocol
+
+from app.config import settings
+from app.utils.cache import TTLCache
+from app.utils.sqlite_kv import SQLiteKV
+
+
+@dataclass
+class CallSession:
+    call_sid: str
+    phone: str
+    profile_id: int | None
+    name: str | None
+    gender: str
+    language_code: str
+    twilio_language: str
+    voice: str
+
+    @property
+    def resolved(self) -> bool:
+        # False when the caller had no profile yet and defaults were used.
+        return self.profile_id is not None
+
+
+class SessionStore(Protocol):
+    async def get(self, call_sid: str) -> CallSession | None: ...
+
+    async def set(self, session: CallSession) -> None: ...
+
+    async def delete(self, call_sid: str) -> None: ...
+
+
+class MemorySessionStore:
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self._cache: TTLCache[str, CallSession] = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, call_sid: str) -> CallSession | None:
+        return self._cache.get(call_sid, None)
+
+    async def set(self, session: CallSession) -> None:
+        self._cache.set(session.call_sid, session)
+
+    async def delete(self, call_sid: str) -> None:
+        self._cache.pop(call_sid)
+
+    def stats(self) -> dict[str, float]:
+        return self._cache.stats()
+
+
+class SQLiteSessionStore:
+    """File-backed store shared by every worker that opens the same path."""
+
+    def __init__(self, path: str, maxsize: int, ttl: float) -> None:
+        self._kv = SQLiteKV(path, "call_sessions", maxsize=maxsize, ttl=ttl)
+
+    async def get(self, call_sid: str) -> CallSession | None:
+        data = await self._kv.get(call_sid)
+        return CallSession(**json.loads(data)) if data else None
+
+    async def set(self, session: CallSession) -> None:
+        await self._kv.set(session.call_sid, json.dumps(asdict(session)))
+
+    async def delete(self, call_sid: str) -> None:
+        await self._kv.delete(call_sid)
+
+
+def _build_store() -> SessionStore:
+    if settings.call_session_backend == "sqlite":
+        return SQLiteSessionStore(
+            settings.call_session_path,
+            maxsize=settings.call_session_max,
+            ttl=settings.call_session_ttl_seconds,
+        )
+    return MemorySessionStore(maxsize=settings.call_session_max, ttl=settings.call_session_ttl_seconds)
+
+
+store: SessionStore = _build_store()
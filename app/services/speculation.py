@@ -0,0 +1,180 @@
+"""
+Speculative replies from partial speech results.
+
+With SPECULATIVE_REPLIES_ENABLED the <Gather> posts partial transcripts to
+/voice/partial, which passes them here keyed by CallSid. Once the transcript
+stops changing (Twilio marks all of it stable, or it stays the same for
+SPECULATION_STABLE_MS) the reply is generated in the background, while Twilio
+is still waiting to decide that the caller has finished. `/voice/handle`
+then `take`s it: a speculation for the same words, language and name is
+reused, finished or still running; anything else is cancelled. Discarded
+speculations that had already called the LLM are counted as wasted.
+
+State is per process, so this needs a single worker: `python -m app.cli
+serve` turns it off when starting more than one.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from app.config import settings
+from app.services import conversation
+from app.services import nlp
+from app.utils import timing
+from app.utils.metrics import Counter
+from app.utils.timing import stage
+
+SPECULATIONS = Counter(
+    "speculative_replies_total",
+    "Speculative replies by outcome: hit (used), miss (final transcript differed), "
+    "superseded (transcript changed first) or expired (never taken).",
+    ("outcome",),
+)
+WASTED_LLM_CALLS = Counter("speculative_llm_calls_wasted_total", "LLM calls made for speculative replies that were discarded.")
+
+# State for a call that never reaches /voice/handle (the caller hung up) is dropped after this.
+_KEEP_SECONDS = 30.0
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+Key = tuple[str, str, Optional[str]]  # (normalized transcript, language, caller name)
+
+
+def normalize(text: str) -> str:
+    # Partial and final results differ in case and punctuation more than in words.
+    return " ".join(_PUNCTUATION.sub(" ", text.casefold()).split())
+
+
+@dataclass(eq=False)
+class _Speculation:
+    call_sid: str
+    key: Key
+    task: asyncio.Task | None = None
+    llm_called: bool = False
+
+
+@dataclass(eq=False)
+class _CallState:
+    sequence: int = -1
+    key: Key | None = None  # latest partial transcript
+    timer: asyncio.TimerHandle | None = None  # starts a speculation once `key` has been stable long enough
+    speculation: _Speculation | None = None
+    expiry: asyncio.TimerHandle | None = None
+
+
+_calls: dict[str, _CallState] = {}
+
+
+def partial(call_sid: str, sequence: int, stable: str, unstable: str, language_code: str, name: Optional[str]) -> None:
+    """Handle one partialResultCallback for `call_sid`."""
+    state = _calls.get(call_sid)
+    if state is None:
+        state = _calls[call_sid] = _CallState()
+    if sequence <= state.sequence:
+        return  # callbacks can arrive out of order; only the newest counts
+    state.sequence = sequence
+    loop = asyncio.get_running_loop()
+    if state.expiry is not None:
+        state.expiry.cancel()
+    state.expiry = loop.call_later(_KEEP_SECONDS, _expire, call_sid, state)
+
+    utterance = f"{stable} {unstable}".strip()
+    key = (normalize(utterance), language_code, name)
+    if not key[0]:
+        return
+    if key != state.key:
+        state.key = key
+        if state.timer is not None:
+            state.timer.cancel()
+            state.timer = None
+        if state.speculation is not None:
+            _discard(state.speculation, "superseded")
+            state.speculation = None
+    elif state.speculation is not None:
+        return  # already generating for this transcript
+    if not normalize(unstable):
+        # Twilio considers all of it stable: no point waiting.
+        if state.timer is not None:
+            state.timer.cancel()
+        _start(call_sid, state, key, utterance)
+    elif state.timer is None:
+        state.timer = loop.call_later(settings.speculation_stable_ms / 1000, _start, call_sid, state, key, utterance)
+
+
+def _start(call_sid: str, state: _CallState, key: Key, utterance: str) -> None:
+    state.timer = None
+    speculation = _Speculation(call_sid, key)
+    speculation.task = asyncio.create_task(_generate(speculation, utterance))
+    state.speculation = speculation
+
+
+async def _generate(speculation: _Speculation, utterance: str) -> nlp.Reply:
+    timing.detach()
+    _, language_code, name = speculation.key
+
+    def called() -> None:
+        speculation.llm_called = True
+
+    # The call's history can't change before this turn's /voice/handle.
+    history = await conversation.store.history(speculation.call_sid)
+    return await nlp.speculate(utterance, language_code, name, history, on_llm_call=called)
+
+
+def _discard(speculation: _Speculation, outcome: str) -> None:
+    SPECULATIONS.inc(outcome)
+    if speculation.task is not None and not speculation.task.done():
+        speculation.task.cancel()
+    if speculation.llm_called:
+        WASTED_LLM_CALLS.inc()
+
+
+def _clear(state: _CallState) -> None:
+    for handle in (state.timer, state.expiry):
+        if handle is not None:
+            handle.cancel()
+
+
+def _expire(call_sid: str, state: _CallState) -> None:
+    if _calls.get(call_sid) is not state:
+        return
+    del _calls[call_sid]
+    _clear(state)
+    if state.speculation is not None:
+        _discard(state.speculation, "expired")
+
+
+async def take(call_sid: str, utterance: str, language_code: str, name: Optional[str]) -> Optional[nlp.Reply]:
+    """
+    The speculative reply for this turn's final `utterance`, waiting for it if
+    it is still being generated; None if there is no matching speculation.
+    Ends the turn's speculation state either way.
+    """
+    state = _calls.pop(call_sid, None)
+    if state is None:
+        return None
+    _clear(state)
+    speculation = state.speculation
+    if speculation is None:
+        return None
+    if speculation.key != (normalize(utterance), language_code, name):
+        _discard(speculation, "miss")
+        return None
+    SPECULATIONS.inc("hit")
+    assert speculation.task is not None
+    with stage("llm"):
+        return await speculation.task
+
+
+async def shutdown() -> None:
+    tasks = []
+    for state in _calls.values():
+        _clear(state)
+        if state.speculation is not None and state.speculation.task is not None:
+            state.speculation.task.cancel()
+            tasks.append(state.speculation.task)
+    _calls.clear()
+    await asyncio.gather(*tasks, return_exceptions=True)
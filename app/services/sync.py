@@ -0,0 +1,204 @@
+"""
+CRM -> local DB warm sync.
+
+Pages through the CRM listing (CRM_LIST_URL) or a file of phone numbers, fetches
+each profile through `crm.lookup` with bounded parallelism and stores
+each page with one batched `upsert_from_crm`-style transaction. Progress is
+checkpointed to a JSON file after every page so an interrupted run resumes
+where it stopped. Lookups that fail (as opposed to numbers the CRM doesn't
+know) are retried; a page that still has failures after
+CRM_SYNC_MAX_ATTEMPTS stops the run without moving the checkpoint past it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import AsyncIterator
+
+from app.config import settings
+from app.db import SessionLocal
+from app.services import crm as crm_svc
+from app.services import profiles as prof_svc
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Checkpoint:
+    source: str
+    position: str | None = None  # listing cursor, or line offset for number files
+    fetched: int = 0
+    upserted: int = 0
+    done: bool = False
+
+
+@dataclass
+class SyncStats:
+    fetched: int = 0
+    upserted: int = 0
+    missing: int = 0
+    failed: int = 0  # lookups still failing when the run stopped; retried on resume
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return self.upserted / elapsed if elapsed > 0 else 0.0
+
+
+def _load_checkpoint(path: Path, source: str) -> Checkpoint:
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return Checkpoint(source=source)
+    checkpoint = Checkpoint(**data)
+    if checkpoint.source != source or checkpoint.done:
+        return Checkpoint(source=source)
+    return checkpoint
+
+
+def _save_checkpoint(path: Path, checkpoint: Checkpoint) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Per-process temp name: two writers must not rename each other's file.
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(asdict(checkpoint)))
+    tmp.replace(path)
+
+
+async def _listing_pages(cursor: str | None, page_size: int) -> AsyncIterator[tuple[list[str], str | None]]:
+    while True:
+        numbers, cursor = await crm_svc.list_numbers(cursor, page_size)
+        yield numbers, cursor
+        if cursor is None:
+            return
+
+
+async def _file_pages(path: Path, offset: int, page_size: int) -> AsyncIterator[tuple[list[str], str | None]]:
+    with path.open(encoding="utf-8") as fh:
+        lines = islice(fh, offset, None)
+        while True:
+            page = list(islice(lines, page_size))
+            if not page:
+                return
+            offset += len(page)
+            yield [n for n in (line.strip() for line in page) if n], str(offset)
+
+
+async def _wait_for_crm() -> None:
+    # Don't burn through pages while the circuit breaker is short-circuiting,
+    # nor while it is half-open with someone else's trial request in flight.
+    breaker = crm_svc.breaker
+    while breaker.state == "open" or (breaker.state == "half_open" and breaker.trial_in_flight):
+        await asyncio.sleep(1.0)
+
+
+async def _fetch_page(numbers: list[str]) -> tuple[dict[str, crm_svc.CRMProfile], list[str]]:
+    """Profiles found on this page, and the numbers still failing after CRM_SYNC_MAX_ATTEMPTS."""
+    found: dict[str, crm_svc.CRMProfile] = {}
+    pending = numbers
+    for attempt in range(settings.crm_sync_max_attempts):
+        if attempt:
+            await asyncio.sleep(min(2.0 ** (attempt - 1), settings.crm_breaker_cooldown_seconds))
+        await _wait_for_crm()
+        if crm_svc.breaker.state == "half_open":
+            # Only one request gets through: send a single number as the trial.
+            trial, failed = await crm_svc.lookup_many(pending[:1], concurrency=1, queue_wait=math.inf)
+            found.update(trial)
+            if failed:
+                continue
+            pending = pending[1:]
+        # Background work queues for CRM slots instead of being shed.
+        fetched, pending = await crm_svc.lookup_many(
+            pending, concurrency=settings.crm_sync_concurrency, queue_wait=math.inf
+        )
+        found.update(fetched)
+        if not pending:
+            break
+    return found, pending
+
+
+async def run(numbers_file: str | None = None, resume: bool = True) -> SyncStats:
+    """Sync from `numbers_file` if given, else from the CRM listing."""
+    source = f"file:{numbers_file}" if numbers_file else f"list:{settings.crm_list_url}"
+    checkpoint_path = Path(settings.crm_sync_checkpoint_path)
+    checkpoint = _load_checkpoint(checkpoint_path, source) if resume else Checkpoint(source=source)
+    page_size = settings.crm_sync_page_size
+
+    if numbers_file:
+        pages = _file_pages(Path(numbers_file), int(checkpoint.position or 0), page_size)
+    elif settings.crm_list_url:
+        pages = _listing_pages(checkpoint.position, page_size)
+    else:
+        raise ValueError("Nothing to sync: pass a numbers file or set CRM_LIST_URL")
+
+    stats = SyncStats()
+    if checkpoint.position:
+        logger.info("Resuming CRM sync from %s at %s", source, checkpoint.position)
+
+    async for numbers, position in pages:
+        fetched, failed = await _fetch_page(numbers)
+        if fetched:
+            async with SessionLocal() as db:
+                stats.upserted += await prof_svc.upsert_many_from_crm(
+                    db,
+                    list(fetched.values()),
+                    settings.default_language,
+                    settings.default_gender,
+                )
+        if failed:
+            # Profiles found so far are stored; the checkpoint stays before this page.
+            stats.failed = len(failed)
+            logger.warning(
+                "CRM sync stopped: %d lookups still failing after %d attempts; rerun to resume",
+                len(failed), settings.crm_sync_max_attempts,
+            )
+            return stats
+        stats.fetched += len(numbers)
+        stats.missing += len(numbers) - len(fetched)
+
+        checkpoint.position = position
+        checkpoint.fetched += len(numbers)
+        checkpoint.upserted += len(fetched)
+        _save_checkpoint(checkpoint_path, checkpoint)
+        logger.info(
+            "CRM sync: %d numbers, %d upserted, %d missing (%.1f rows/s)",
+            stats.fetched, stats.upserted, stats.missing, stats.rows_per_second,
+        )
+
+    checkpoint.done = True
+    _save_checkpoint(checkpoint_path, checkpoint)
+    return stats
+
+
+_task: asyncio.Task | None = None
+
+
+def start_background() -> None:
+    global _task
+    if _task is None or _task.done():
+        _task = asyncio.create_task(run_logged())
+
+
+async def run_logged() -> None:
+    """`run` from the CRM listing, logging the outcome instead of raising."""
+    try:
+        stats = await run()
+        logger.info("CRM sync finished: %d upserted at %.1f rows/s", stats.upserted, stats.rows_per_second)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        logger.exception("CRM sync failed")
+
+
+async def shutdown() -> None:
+    if _task is not None and not _task.done():
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
@@ -1,19 +1,272 @@
 """
-TTS abstraction.
+TTS pipeline.
 
-MVP relies on Twilio <Say> so we do not generate audio here.
-This module can be extended to call OpenAI/Azure/Polly and return an audio URL.
+`synthesize_to_url` returns a URL for audio of (text, language, gender) that
+Twilio can `<Play>`, or None to keep using `<Say>` (TTS_PROVIDER=none, the
+default, or when synthesis is busy, slow or failing). Audio is stored in a
+content-addressed cache under TTS_CACHE_DIR, named by a digest of provider,
+voice, language and text, and served by `app.routers.tts` at /tts/{digest}.{ext}.
+Static prompts are synthesized once at startup (`start_precompute`); dynamic
+replies are synthesized on demand, TTS_MAX_IN_FLIGHT at a time.
+
+`stream` is the Media Streams counterpart: it yields 8 kHz mu-law audio as
+the provider produces it, uncached, for `app.services.media_stream`.
+
+Providers:
+  stub    deterministic WAV tone, no network (tests, load tests)
+  openai  OpenAI speech API (multilingual voices, e.g. for Marathi)
 """
 
 from __future__ import annotations
 
-from typing import Optional
+import asyncio
+import hashlib
+import io
+import logging
+import math
+import os
+import struct
+import wave
+from pathlib import Path
+from typing import AsyncIterator, Iterable, Optional, Protocol
+
+from app.config import settings
+from app.utils import mulaw
+from app.utils.admission import Limiter, Shed
+from app.utils.timing import stage
+
+logger = logging.getLogger(__name__)
+
+
+class Synthesizer(Protocol):
+    name: str
+    extension: str
+    rate: int  # sample rate of `stream`
+
+    def voice_for(self, language_code: str, gender: str) -> str: ...
+
+    async def synthesize(self, text: str, language_code: str, voice: str) -> bytes: ...
+
+    def stream(self, text: str, language_code: str, voice: str) -> AsyncIterator[bytes]:
+        """16-bit mono PCM at `rate`, in chunks as it is produced."""
+        ...
+
+
+class StubSynthesizer:
+    """Sine tone (pitch from the voice, length from the text) as 8 kHz mono WAV."""
+
+    name = "stub"
+    extension = "wav"
+    rate = 8000
+
+    def voice_for(self, language_code: str, gender: str) -> str:
+        return gender or "neutral"
+
+    def _pcm(self, text: str, voice: str, start: int, stop: int) -> bytes:
+        pitch = {"female": 440.0, "male": 220.0}.get(voice, 330.0)
+        samples = [int(12000 * math.sin(2 * math.pi * pitch * n / self.rate)) for n in range(start, stop)]
+        return struct.pack(f"<{len(samples)}h", *samples)
+
+    def _frames(self, text: str) -> int:
+        return int(self.rate * min(0.06 * len(text), 20.0))
+
+    async def synthesize(self, text: str, language_code: str, voice: str) -> bytes:
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as out:
+            out.setnchannels(1)
+            out.setsampwidth(2)
+            out.setframerate(self.rate)
+            out.writeframes(self._pcm(text, voice, 0, self._frames(text)))
+        return buf.getvalue()
+
+    async def stream(self, text: str, language_code: str, voice: str) -> AsyncIterator[bytes]:
+        total = self._frames(text)
+        chunk = self.rate // 10
+        for start in range(0, total, chunk):
+            yield self._pcm(text, voice, start, min(start + chunk, total))
+
+
+class OpenAISynthesizer:
+    name = "openai"
+    extension = "mp3"
+    rate = 24000  # the API's raw "pcm" format
+
+    def voice_for(self, language_code: str, gender: str) -> str:
+        return {"female": "nova", "male": "onyx"}.get(gender, "alloy")
+
+    async def synthesize(self, text: str, language_code: str, voice: str) -> bytes:
+        from app.services.nlp import get_client
+
+        response = await get_client().audio.speech.create(
+            model=settings.tts_openai_model,
+            voice=voice,
+            input=text,
+            response_format="mp3",
+        )
+        return response.content
+
+    async def stream(self, text: str, language_code: str, voice: str) -> AsyncIterator[bytes]:
+        from app.services.nlp import get_client
+
+        async with get_client().audio.speech.with_streaming_response.create(
+            model=settings.tts_openai_model,
+            voice=voice,
+            input=text,
+            response_format="pcm",
+        ) as response:
+            async for chunk in response.iter_bytes(4800):
+                yield chunk
+
+
+_PROVIDERS = {"stub": StubSynthesizer, "openai": OpenAISynthesizer}
+
+synthesizer: Synthesizer | None = _PROVIDERS[settings.tts_provider]() if settings.tts_provider in _PROVIDERS else None
+
+limiter = Limiter(
+    "tts",
+    limit=settings.tts_max_in_flight,
+    queue_wait=settings.tts_queue_wait_seconds,
+    max_queue=settings.tts_max_queue,
+)
+
+_cache_dir = Path(settings.tts_cache_dir)
+_known: set[str] = set()  # file names known to exist, to skip the stat on hot paths
+_pending: dict[str, asyncio.Future] = {}
 
 
-async def synthesize_to_url(text: str, language_code: str, gender: str) -> Optional[str]:
+def digest(text: str, language_code: str, voice: str, provider: str) -> str:
+    key = "\x00".join((provider, voice, language_code, text))
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def audio_path(filename: str) -> Path:
+    # Two-level fan-out keeps directories small.
+    return _cache_dir / filename[:2] / filename
+
+
+def _url(filename: str) -> str:
+    return f"{settings.public_base_url.rstrip('/')}/tts/{filename}"
+
+
+def _store(filename: str, audio: bytes) -> None:
+    path = audio_path(filename)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_bytes(audio)
+    tmp.replace(path)
+
+
+async def _synthesize(filename: str, text: str, language_code: str, voice: str, queue_wait: float | None) -> bool:
+    assert synthesizer is not None
+    try:
+        async with limiter.slot(queue_wait):
+            audio = await asyncio.wait_for(
+                synthesizer.synthesize(text, language_code, voice),
+                timeout=settings.tts_timeout_seconds,
+            )
+        await asyncio.to_thread(_store, filename, audio)
+    except Shed:
+        return False
+    except asyncio.TimeoutError:
+        logger.warning("TTS timed out after %.1fs", settings.tts_timeout_seconds)
+        return False
+    except Exception:
+        logger.exception("TTS synthesis failed")
+        return False
+    _known.add(filename)
+    return True
+
+
+async def synthesize_to_url(
+    text: str,
+    language_code: str,
+    gender: str,
+    queue_wait: float | None = None,
+) -> Optional[str]:
+    """
+    URL of cached audio for `text`, synthesizing it first if needed. None
+    means "use <Say>": no provider configured, or synthesis was shed, timed
+    out or failed.
+    """
+    if synthesizer is None or not text:
+        return None
+    voice = synthesizer.voice_for(language_code, gender)
+    filename = f"{digest(text, language_code, voice, synthesizer.name)}.{synthesizer.extension}"
+    if filename in _known:
+        return _url(filename)
+    if audio_path(filename).is_file():
+        _known.add(filename)
+        return _url(filename)
+
+    with stage("tts"):
+        pending = _pending.get(filename)
+        if pending is None:
+            pending = asyncio.ensure_future(_synthesize(filename, text, language_code, voice, queue_wait))
+            _pending[filename] = pending
+            pending.add_done_callback(lambda _: _pending.pop(filename, None))
+        ok = await asyncio.shield(pending)
+    return _url(filename) if ok else None
+
+
+def _downsample(pcm: bytes, factor: int) -> bytes:
+    # Averaging each group of `factor` samples doubles as a crude low-pass filter.
+    samples = memoryview(pcm).cast("h")
+    return struct.pack(
+        f"<{len(samples) // factor}h",
+        *(sum(samples[i:i + factor]) // factor for i in range(0, len(samples) - factor + 1, factor)),
+    )
+
+
+async def stream(text: str, language_code: str, gender: str) -> AsyncIterator[bytes]:
     """
-    Return a URL to synthesized audio (e.g., S3 or CDN) for the given text.
-    Not used in MVP when Twilio <Say> is used.
+    Speak `text` as 8 kHz mu-law chunks while the provider is still
+    producing it (nothing if no provider is configured). Not cached and not
+    admission-limited: consumption is paced by playback, so a slot would be
+    held for the length of the reply.
     """
-    return None
+    if synthesizer is None or not text:
+        return
+    voice = synthesizer.voice_for(language_code, gender)
+    factor = max(1, synthesizer.rate // mulaw.SAMPLE_RATE)
+    step = 2 * factor  # bytes per output sample
+    pending = b""
+    async for chunk in synthesizer.stream(text, language_code, voice):
+        pending += chunk
+        usable = len(pending) - len(pending) % step
+        if usable:
+            pcm, pending = pending[:usable], pending[usable:]
+            yield mulaw.encode(_downsample(pcm, factor) if factor > 1 else pcm)
+
+
+def media_type(filename: str) -> str:
+    return {"wav": "audio/wav", "mp3": "audio/mpeg"}.get(filename.rsplit(".", 1)[-1], "application/octet-stream")
+
+
+_precompute_task: asyncio.Task | None = None
+
+
+async def precompute(items: Iterable[tuple[str, str, str]]) -> int:
+    """Synthesize (text, language_code, gender) items that aren't cached yet; returns how many are ready."""
+    results = await asyncio.gather(
+        *(synthesize_to_url(text, language, gender, queue_wait=math.inf) for text, language, gender in set(items))
+    )
+    return sum(url is not None for url in results)
+
+
+def start_precompute(items: Iterable[tuple[str, str, str]]) -> None:
+    """Warm the cache in the background; calls until then fall back to <Say> or synthesize on demand."""
+    global _precompute_task
+    if synthesizer is None:
+        return
+    _precompute_task = asyncio.create_task(_precompute_logged(list(items)))
+
+
+async def _precompute_logged(items: list[tuple[str, str, str]]) -> None:
+    ready = await precompute(items)
+    logger.info("TTS: %d/%d static prompts cached", ready, len(set(items)))
+
 
+async def shutdown() -> None:
+    if _precompute_task is not None and not _precompute_task.done():
+        _precompute_task.cancel()
+        await asyncio.gather(_precompute_task, return_exceptions=True)
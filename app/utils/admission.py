@@ -0,0 +1,94 @@
+"""
+Admission control for slow dependencies.
+
+A `Limiter` allows `limit` concurrent calls. Further callers queue FIFO, but
+only for their wait budget and only while fewer than `max_queue` are waiting;
+otherwise `Shed` is raised so the caller can degrade (defaults instead of the
+CRM, a template instead of the LLM) rather than pile on latency.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from app.utils.metrics import Counter
+
+SHED = Counter("admission_shed_total", "Calls refused by admission control, by dependency and reason.", ("dependency", "reason"))
+
+# name -> limiter, for /metrics
+LIMITERS: dict[str, "Limiter"] = {}
+
+
+class Shed(Exception):
+    """No slot became free within the wait budget (or the queue was full)."""
+
+
+class Limiter:
+    def __init__(self, name: str, limit: int, queue_wait: float, max_queue: int) -> None:
+        self.name = name
+        self.limit = limit
+        self.queue_wait = queue_wait
+        self.max_queue = max_queue
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        LIMITERS[name] = self
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def _shed(self, reason: str) -> Shed:
+        SHED.inc(self.name, reason)
+        return Shed(f"{self.name}: {reason}")
+
+    async def acquire(self, wait: float | None = None) -> float:
+        """
+        Take a slot, waiting at most `wait` seconds (default `queue_wait`;
+        math.inf waits indefinitely). Returns the seconds spent queued.
+        """
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return 0.0
+        budget = self.queue_wait if wait is None else wait
+        if budget <= 0 or len(self._waiters) >= self.max_queue:
+            raise self._shed("queue_full" if budget > 0 else "no_wait")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        start = time.monotonic()
+        try:
+            await asyncio.wait({waiter}, timeout=None if math.isinf(budget) else budget)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # the slot was handed to us just as we were cancelled
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            raise
+        if not waiter.done():
+            waiter.cancel()
+            self._waiters.remove(waiter)
+            raise self._shed("wait_budget")
+        return time.monotonic() - start
+
+    def release(self) -> None:
+        # Hand the slot straight to the next live waiter, or free it.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, wait: float | None = None) -> AsyncIterator[float]:
+        waited = await self.acquire(wait)
+        try:
+            yield waited
+        finally:
+            self.release()
@@ -0,0 +1,127 @@
+"""
+Minimal in-process metrics with Prometheus text exposition.
+
+Counters and histograms are plain dicts keyed by label values, updated from
+the event loop without locks (one loop per worker). Values that already live
+elsewhere (cache hit counters, reply sources) are read at scrape time through
+`render(samples)` instead of being double-counted here.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Iterable
+
+# Seconds; covers sub-millisecond cache hits up to the LLM reply budget.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        REGISTRY.append(self)
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series: dict[tuple[str, ...], list] = {}
+        REGISTRY.append(self)
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total!r}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+REGISTRY: list[Counter | Histogram] = []
+
+# A scrape-time sample: (metric name, type, help, {label: value}, value).
+Sample = tuple[str, str, str, dict[str, str], float]
+
+
+def render(samples: Iterable[Sample] = ()) -> str:
+    lines: list[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    described: set[str] = set()
+    for name, kind, help, labels, value in samples:
+        if name not in described:
+            described.add(name)
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+        names = tuple(labels)
+        lines.append(f"{name}{_labels(names, tuple(labels[n] for n in names))} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle a request, by route template.",
+    ("route", "method", "status"),
+)
+STAGE_SECONDS = Histogram(
+    "stage_duration_seconds",
+    "Time spent per processing stage (db, crm, lang_detect, llm, twiml), by route.",
+    ("route", "stage"),
+)
+CRM_ERRORS = Counter("crm_errors_total", "Failed CRM profile lookups, by kind.", ("kind",))
+LLM_ERRORS = Counter("llm_errors_total", "Failed or timed-out LLM replies, by kind.", ("kind",))
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+
+from app.config import settings
+
+# country -> (calling code, national number length, trunk prefix)
+_COUNTRIES = {
+    "US": ("1", 10, "1"),
+    "CA": ("1", 10, "1"),
+    "IN": ("91", 10, "0"),
+    "GB": ("44", 10, "0"),
+    "AU": ("61", 9, "0"),
+}
+
+# Digits-only national forms per country: optional calling code or trunk
+# prefix, then exactly the national number.
+_NATIONAL = {
+    country: re.compile(rf"^(?:{code}|{trunk})?(\d{{{length}}})$")
+    for country, (code, length, trunk) in _COUNTRIES.items()
+}
+_NON_DIGITS = re.compile(r"\D")
+
+
+@lru_cache(maxsize=65536)
+def to_e164(raw: str, region: str | None = None) -> str:
+    """
+    Canonical E.164 form of `raw` ("(415) 555-1234" -> "+14155551234").
+
+    Numbers without a country code are read in `region` (DEFAULT_PHONE_REGION).
+    Input that doesn't look like a phone number (e.g. "unknown", SIP
+    addresses) is returned stripped but otherwise unchanged.
+    """
+    value = (raw or "").strip()
+    if not value or any(ch.isalpha() for ch in value):
+        return value
+    digits = _NON_DIGITS.sub("", value)
+    if value.startswith("+") or value.startswith("00"):
+        if value.startswith("00"):
+            digits = digits[2:]
+        return f"+{digits}" if 8 <= len(digits) <= 15 else value
+
+    country = (region or settings.default_phone_region).upper()
+    pattern = _NATIONAL.get(country)
+    if pattern is not None:
+        match = pattern.match(digits)
+        if match:
+            return f"+{_COUNTRIES[country][0]}{match.group(1)}"
+    return value
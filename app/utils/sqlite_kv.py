@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+class SQLiteKV:
+    """
+    Small file-backed key/value table with TTL expiry, shared by every process
+    that opens the same file. Values are strings; queries run in a worker
+    thread so the event loop never blocks on SQLite I/O.
+    """
+
+    _PURGE_EVERY = 256
+
+    def __init__(self, path: str, table: str, maxsize: int, ttl: float) -> None:
+        self.table = table
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._writes = 0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_expires_at ON {table} (expires_at)")
+
+    def _get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value FROM {self.table} WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + self.ttl),
+            )
+            self._writes += 1
+            if self._writes % self._PURGE_EVERY == 0:
+                self._purge()
+
+    def _purge(self) -> None:
+        # Drop expired rows, then the oldest ones beyond maxsize.
+        self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+        self._conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN ("
+            f"SELECT key FROM {self.table} ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.maxsize,),
+        )
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    async def get(self, key: str) -> str | None:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: str) -> None:
+        await asyncio.to_thread(self._set, key, value)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
@@ -0,0 +1,118 @@
+"""
+Per-request stage timing.
+
+`stage("db")` times a block and adds it to the current request's totals;
+`TimingMiddleware` reports those totals as a `Server-Timing` header and
+records them in the stage histogram under the matched route template. Blocks
+timed outside a request (startup, background sync) go to the histogram with
+route "-". `begin`/`end` do the same for work that isn't a request, such as
+a turn on a Media Streams WebSocket.
+"""
+
+from __future__ import annotations
+
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable
+
+from app.utils.metrics import REQUEST_SECONDS, STAGE_SECONDS
+
+_stages: ContextVar[dict[str, float] | None] = ContextVar("stages", default=None)
+_started: ContextVar[float] = ContextVar("started", default=0.0)
+
+
+def detach() -> None:
+    """Call first thing in a background task so its stages aren't billed to the request that spawned it."""
+    _stages.set(None)
+
+
+def begin() -> None:
+    """Start timing a unit of work that isn't an HTTP request (a Media Streams turn) in the current task."""
+    _stages.set({})
+    _started.set(time.perf_counter())
+
+
+def end(route: str) -> None:
+    """Record the stages timed since `begin()` under `route` and stop timing."""
+    stages = _stages.get()
+    if stages is not None:
+        for name, seconds in stages.items():
+            STAGE_SECONDS.observe(seconds, route, name)
+    _stages.set(None)
+
+
+def current() -> tuple[dict[str, float], float] | None:
+    """(stage seconds so far, seconds since the request started), or None outside a request."""
+    stages = _stages.get()
+    if stages is None:
+        return None
+    return dict(stages), time.perf_counter() - _started.get()
+
+
+class stage:
+    __slots__ = ("name", "_start")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> "stage":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        elapsed = time.perf_counter() - self._start
+        stages = _stages.get()
+        if stages is None:
+            STAGE_SECONDS.observe(elapsed, "-", self.name)
+        else:
+            stages[self.name] = stages.get(self.name, 0.0) + elapsed
+
+
+def _route_of(scope: dict[str, Any]) -> str:
+    # FastAPI stores the matched route in the scope; fall back to a fixed label
+    # so unknown paths can't blow up the label cardinality.
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _server_timing(stages: dict[str, float], total: float) -> bytes:
+    parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in stages.items()]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts).encode("latin-1")
+
+
+class TimingMiddleware:
+    """Pure ASGI middleware, so streaming responses pass through untouched."""
+
+    def __init__(self, app: Callable[..., Awaitable[None]]) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stages: dict[str, float] = {}
+        token = _stages.set(stages)
+        start = time.perf_counter()
+        started_token = _started.set(start)
+        status = 500
+
+        async def send_timed(message: dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _server_timing(stages, time.perf_counter() - start)))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            _stages.reset(token)
+            _started.reset(started_token)
+            route = _route_of(scope)
+            REQUEST_SECONDS.observe(time.perf_counter() - start, route, scope["method"], str(status))
+            for name, seconds in stages.items():
+                STAGE_SECONDS.observe(seconds, route, name)
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
+from functools import lru_cache
 from typing import Optional
 from fastapi import Response
 
 
-def xml_response(xml: str) -> Response:
+def xml_response(xml: str | bytes) -> Response:
     return Response(content=xml, media_type="application/xml")
 
 
@@ -15,18 +16,141 @@ def say_twiml(text: str, language: str, voice: str) -> str:
 </Response>"""
 
 
-def gather_speech_twiml(prompt: str, action_url: str, language: str, voice: str, hints: Optional[str] = None) -> str:
+def play_twiml(audio_url: str) -> str:
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<Response>
+  <Play>{escape(audio_url)}</Play>
+</Response>"""
+
+
+def _speak_xml(text: str, language: str, voice: str, audio_url: Optional[str]) -> str:
+    if audio_url:
+        return f"<Play>{escape(audio_url)}</Play>"
+    return f'<Say language="{language}" voice="{voice}">{escape(text)}</Say>'
+
+
+def gather_speech_twiml(
+    prompt: str,
+    action_url: str,
+    language: str,
+    voice: str,
+    hints: Optional[str] = None,
+    audio_url: Optional[str] = None,
+    partial_url: Optional[str] = None,
+) -> str:
     hints_attr = f' hints="{escape(hints)}"' if hints else ""
+    if partial_url:
+        hints_attr += f' partialResultCallback="{escape(partial_url)}" partialResultCallbackMethod="POST"'
+    speak = _speak_xml(prompt, language, voice, audio_url)
     return f"""<?xml version="1.0" encoding="UTF-8"?>
 <Response>
   <Gather input="speech" action="{action_url}" method="POST" language="{language}"{hints_attr}>
-    <Say language="{language}" voice="{voice}">{escape(prompt)}</Say>
+    {speak}
   </Gather>
   <Say language="{language}" voice="{voice}">We did not receive any input. Goodbye.</Say>
   <Hangup/>
 </Response>"""
 
 
+@lru_cache(maxsize=1024)
+def _gather_bytes(
+    prompt: str,
+    action_url: str,
+    language: str,
+    voice: str,
+    hints: Optional[str],
+    audio_url: Optional[str] = None,
+    partial_url: Optional[str] = None,
+) -> bytes:
+    return gather_speech_twiml(prompt, action_url, language, voice, hints, audio_url, partial_url).encode("utf-8")
+
+
+def gather_response(
+    prompt: str,
+    action_url: str,
+    language: str,
+    voice: str,
+    hints: Optional[str] = None,
+    audio_url: Optional[str] = None,
+    partial_url: Optional[str] = None,
+) -> Response:
+    """
+    Response for a static <Gather> prompt, spoken with <Say> or, given
+    `audio_url`, played; `partial_url` receives partial speech results. Each
+    distinct document is rendered and encoded once.
+    """
+    return xml_response(_gather_bytes(prompt, action_url, language, voice, hints, audio_url, partial_url))
+
+
+def gather_reply_response(
+    text: str,
+    action_url: str,
+    language: str,
+    voice: str,
+    audio_url: Optional[str] = None,
+    partial_url: Optional[str] = None,
+) -> Response:
+    """A dynamic reply inside another <Gather>, so the caller can answer it. Rendered per call."""
+    return xml_response(
+        gather_speech_twiml(text, action_url, language, voice, None, audio_url, partial_url).encode("utf-8")
+    )
+
+
+def connect_stream_twiml(
+    prompt: str,
+    stream_url: str,
+    language: str,
+    voice: str,
+    audio_url: Optional[str] = None,
+) -> str:
+    """Speak `prompt`, then hand the call's audio to the Media Streams WebSocket at `stream_url`."""
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<Response>
+  {_speak_xml(prompt, language, voice, audio_url)}
+  <Connect>
+    <Stream url="{escape(stream_url)}"/>
+  </Connect>
+</Response>"""
+
+
+@lru_cache(maxsize=1024)
+def _connect_bytes(prompt: str, stream_url: str, language: str, voice: str, audio_url: Optional[str]) -> bytes:
+    return connect_stream_twiml(prompt, stream_url, language, voice, audio_url).encode("utf-8")
+
+
+def connect_stream_response(
+    prompt: str,
+    stream_url: str,
+    language: str,
+    voice: str,
+    audio_url: Optional[str] = None,
+) -> Response:
+    return xml_response(_connect_bytes(prompt, stream_url, language, voice, audio_url))
+
+
+def say_response(text: str, language: str, voice: str) -> Response:
+    """Response for dynamic <Say> text, encoded once up front."""
+    return xml_response(say_twiml(text, language, voice).encode("utf-8"))
+
+
+def play_response(audio_url: str) -> Response:
+    return xml_response(play_twiml(audio_url).encode("utf-8"))
+
+
+def precompile_gather(
+    prompt: str,
+    action_url: str,
+    language: str,
+    voice: str,
+    hints: Optional[str] = None,
+    partial_url: Optional[str] = None,
+) -> None:
+    """Warm the static <Gather> cache, e.g. from a startup hook."""
+    _gather_bytes(prompt, action_url, language, voice, hints, None, partial_url)
+
+
+# Chained str.replace beats single-pass str.translate/regex escapers in
+# CPython (see benchmarks/twiml_bench.py), so it stays.
 def escape(text: str) -> str:
     return (
         text.replace("&", "&amp;")
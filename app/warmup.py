@@ -0,0 +1,81 @@
+"""
+Per-worker warm-up.
+
+Work a cold worker would otherwise do during its first live calls: loading
+the langdetect model, importing openai and building its client, rendering
+the static <Gather> prompts and reading the profiles of the
+WARMUP_HOT_PROFILES most recent callers into the profile cache. `/healthz`
+answers 503 until it has finished. Startup either runs it in the background
+(`start`) or, with WARMUP_BEFORE_SERVING, waits for it (`run`).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.db import ReadSessionLocal
+from app.models import CallEvent
+from app.routers import voice as voice_router
+from app.services import langid
+from app.services import nlp
+from app.services import profiles as prof_svc
+
+logger = logging.getLogger(__name__)
+
+_ready = False
+_task: asyncio.Task | None = None
+
+
+def is_ready() -> bool:
+    return _ready
+
+
+async def _hot_profiles() -> int:
+    if settings.warmup_hot_profiles <= 0:
+        return 0
+    async with ReadSessionLocal() as db:
+        res = await db.execute(
+            select(CallEvent.phone_number)
+            .where(CallEvent.profile_found.is_(True))
+            .group_by(CallEvent.phone_number)
+            .order_by(func.max(CallEvent.created_at).desc())
+            .limit(settings.warmup_hot_profiles)
+        )
+        phones = [phone for phone in res.scalars() if phone]
+        return len(await prof_svc.get_many_by_phone(db, phones))
+
+
+async def run() -> None:
+    global _ready
+    start = time.perf_counter()
+    profiles = 0
+    try:
+        voice_router.precompile_prompts()
+        # Imports and model loading are CPU-bound; threads keep the loop free for
+        # health checks meanwhile.
+        await asyncio.to_thread(langid.warm)
+        await asyncio.to_thread(nlp.warm)
+        profiles = await _hot_profiles()
+    except Exception:
+        # Everything warmed here also loads on first use: serve cold rather than never.
+        logger.exception("Warm-up failed; serving without it")
+    finally:
+        _ready = True
+    logger.info("Warm-up done in %.2fs (%d hot profiles cached)", time.perf_counter() - start, profiles)
+
+
+def start() -> None:
+    global _task
+    if _task is None:
+        _task = asyncio.create_task(run())
+
+
+async def shutdown() -> None:
+    if _task is not None and not _task.done():
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
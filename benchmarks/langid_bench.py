@@ -0,0 +1,96 @@
+"""
+Language detection: app.services.langid vs. a bare langdetect.detect call.
+
+    python -m benchmarks.langid_bench [-n 20]
+
+Reports first-call (cold) latency, steady-state latency per utterance and
+accuracy on a small labelled set of short caller utterances.
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+import time
+
+SAMPLES = [
+    ("en", "what is my balance"),
+    ("en", "talk to an agent"),
+    ("en", "I want to cancel my order"),
+    ("en", "my internet is not working"),
+    ("en", "yes please"),
+    ("en", "when will my refund arrive"),
+    ("hi", "मुझे मदद चाहिए"),
+    ("hi", "मेरा बैलेंस क्या है"),
+    ("hi", "मैं अपना ऑर्डर रद्द करना चाहता हूँ"),
+    ("hi", "मेरा इंटरनेट काम नहीं कर रहा है"),
+    ("hi", "एजेंट से बात करनी है"),
+    ("hi", "रिफंड कब आएगा"),
+    ("mr", "मला मदत पाहिजे"),
+    ("mr", "माझा बॅलन्स किती आहे"),
+    ("mr", "मला माझी ऑर्डर रद्द करायची आहे"),
+    ("mr", "माझे इंटरनेट चालत नाही"),
+    ("mr", "एजंटशी बोलायचे आहे"),
+    ("mr", "परतावा कधी मिळेल"),
+]
+
+
+def _bare_detect(text: str) -> str | None:
+    from langdetect import detect
+
+    try:
+        return detect(text)
+    except Exception:
+        return None
+
+
+_COLD = {
+    "langdetect": "from benchmarks.langid_bench import _bare_detect as fn",
+    "langid": "from app.services.langid import detect as fn",
+}
+
+
+def _cold_ms(name: str, text: str) -> float:
+    # Fresh interpreter so the first call pays whatever the detector loads lazily.
+    code = (
+        f"{_COLD[name]}\n"
+        "import time\n"
+        "t = time.perf_counter()\n"
+        f"fn({text!r})\n"
+        "print((time.perf_counter() - t) * 1e3)"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip())
+
+
+def _run(name: str, fn, rounds: int) -> None:
+    correct = sum(fn(text) == expected for expected, text in SAMPLES)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for _, text in SAMPLES:
+            fn(text)
+    per_call = (time.perf_counter() - start) / (rounds * len(SAMPLES))
+
+    print(f"{name:18s} steady {per_call * 1e6:9.1f} us/call   accuracy {correct}/{len(SAMPLES)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'langdetect':18s} cold {_cold_ms('langdetect', 'what is my balance'):8.1f} ms (first call)")
+    print(f"{'langid':18s} cold {_cold_ms('langid', 'what is my balance'):8.1f} ms (first call, Latin)")
+    print(f"{'langid':18s} cold {_cold_ms('langid', 'मला मदत पाहिजे'):8.1f} ms (first call, Devanagari)")
+
+    from app.services import langid
+
+    _run("langdetect", _bare_detect, args.rounds)
+    _run("langid", langid.detect, args.rounds)
+    _run("langid (no memo)", langid._detect, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Webhook load test for /voice/incoming and /voice/handle.
+
+    python -m benchmarks.loadtest [--rate 20] [--duration 30] [--turns 2]
+                                  [--url http://127.0.0.1:8000]
+                                  [--save baseline.json] [--compare baseline.json]
+
+Starts the CRM/LLM stand-ins from benchmarks.stubs in a subprocess, then
+places calls at a fixed rate (open loop, so a slow app builds a backlog
+instead of slowing the load down). Each call posts a Twilio-shaped
+/voice/incoming followed by `--turns` /voice/handle requests from a
+synthetic caller population. The first `--local-fraction` of the population
+is imported into the app first, and the CRM knows the first `--crm-fraction`.
+
+Without --url the app runs in-process over httpx's ASGI transport against a
+throwaway SQLite file. With --url the target must already be configured with
+the CRM_API_BASE_URL / OPENAI_BASE_URL printed at start-up (--stub-port
+fixes the port).
+
+Prints throughput and p50/p95/p99 per endpoint plus the app's own per-stage
+means from /metrics. --save writes the results as JSON. --compare prints the
+change against a saved run and exits 1 if any endpoint's p95 or p99 regressed
+by more than --tolerance.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import re
+import socket
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+
+from benchmarks import stubs
+from benchmarks.langid_bench import SAMPLES
+
+ENDPOINTS = ("/voice/incoming", "/voice/handle")
+_STAGE_LINE = re.compile(r'^stage_duration_seconds_(sum|count)\{route="([^"]+)",stage="([^"]+)"\} (\S+)$')
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_stubs(args: argparse.Namespace) -> tuple[multiprocessing.Process, str]:
+    port = args.stub_port or _free_port()
+    process = multiprocessing.Process(target=stubs.serve, args=(port, args), daemon=True)
+    process.start()
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{base}/stats", timeout=1.0)
+            return process, base
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.terminate()
+    raise SystemExit("stub servers did not start")
+
+
+def _sid(prefix: str) -> str:
+    return prefix + uuid.uuid4().hex
+
+
+def _incoming_form(caller: str, call_sid: str) -> dict[str, str]:
+    return {
+        "AccountSid": "AC" + "0" * 32,
+        "ApiVersion": "2010-04-01",
+        "CallSid": call_sid,
+        "CallStatus": "ringing",
+        "Called": "+18005550100",
+        "Caller": caller,
+        "Direction": "inbound",
+        "From": caller,
+        "FromCountry": "US",
+        "To": "+18005550100",
+        "ToCountry": "US",
+    }
+
+
+def _handle_form(caller: str, call_sid: str, utterance: str) -> dict[str, str]:
+    return {
+        **_incoming_form(caller, call_sid),
+        "CallStatus": "in-progress",
+        "SpeechResult": utterance,
+        "Confidence": f"{random.uniform(0.6, 0.98):.8f}",
+    }
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = {endpoint: [] for endpoint in ENDPOINTS}
+        self.errors: dict[str, int] = {endpoint: 0 for endpoint in ENDPOINTS}
+
+    async def post(self, client: httpx.AsyncClient, endpoint: str, form: dict[str, str]) -> None:
+        start = time.perf_counter()
+        try:
+            response = await client.post(endpoint, data=form)
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        self.latencies[endpoint].append(time.perf_counter() - start)
+        if failed:
+            self.errors[endpoint] += 1
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(recorder: Recorder, elapsed: float) -> dict[str, dict[str, float]]:
+    results: dict[str, dict[str, float]] = {}
+    for endpoint, values in recorder.latencies.items():
+        values = sorted(values)
+        results[endpoint] = {
+            "requests": len(values),
+            "errors": recorder.errors[endpoint],
+            "throughput_rps": len(values) / elapsed if elapsed else 0.0,
+            "p50_ms": _percentile(values, 50) * 1e3,
+            "p95_ms": _percentile(values, 95) * 1e3,
+            "p99_ms": _percentile(values, 99) * 1e3,
+            "max_ms": (values[-1] if values else 0.0) * 1e3,
+        }
+    return results
+
+
+def stage_means(metrics_text: str) -> dict[str, dict[str, float]]:
+    """Mean ms per stage per voice route, from the app's /metrics output."""
+    sums: dict[tuple[str, str], list[float]] = {}
+    for line in metrics_text.splitlines():
+        match = _STAGE_LINE.match(line)
+        if match and match.group(2) in ENDPOINTS:
+            kind, route, stage, value = match.groups()
+            entry = sums.setdefault((route, stage), [0.0, 0.0])
+            entry[0 if kind == "sum" else 1] = float(value)
+    means: dict[str, dict[str, float]] = {}
+    for (route, stage), (total, count) in sorted(sums.items()):
+        if count:
+            means.setdefault(route, {})[stage] = total / count * 1e3
+    return means
+
+
+async def _seed(client: httpx.AsyncClient, count: int) -> None:
+    body = "\n".join(json.dumps(stubs.profile(i)) for i in range(count)).encode()
+    response = await client.post("/profiles/import", content=body, headers={"Content-Type": "application/x-ndjson"})
+    response.raise_for_status()
+
+
+async def _call(client: httpx.AsyncClient, recorder: Recorder, caller: str, turns: int, think: float) -> None:
+    call_sid = _sid("CA")
+    await recorder.post(client, "/voice/incoming", _incoming_form(caller, call_sid))
+    for _ in range(turns):
+        # Callers speak a few seconds after the prompt.
+        await asyncio.sleep(random.uniform(0.5, 1.5) * think)
+        _, utterance = random.choice(SAMPLES)
+        await recorder.post(client, "/voice/handle", _handle_form(caller, call_sid, utterance))
+
+
+async def drive(client: httpx.AsyncClient, args: argparse.Namespace) -> dict:
+    await _seed(client, int(args.population * args.local_fraction))
+
+    recorder = Recorder()
+    loop = asyncio.get_running_loop()
+    calls: list[asyncio.Task] = []
+    start = loop.time()
+    for n in range(int(args.rate * args.duration)):
+        delay = start + n / args.rate - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        caller = stubs.number(random.randrange(args.population))
+        calls.append(asyncio.create_task(_call(client, recorder, caller, args.turns, args.think)))
+    await asyncio.gather(*calls)
+    elapsed = loop.time() - start
+
+    metrics = await client.get("/metrics")
+    return {
+        "config": {
+            key: getattr(args, key)
+            for key in (
+                "rate", "duration", "turns", "think", "population", "local_fraction", "crm_fraction",
+                "crm_latency", "crm_error_rate", "llm_latency", "llm_error_rate",
+            )
+        },
+        "target": args.url or "in-process",
+        "calls": len(calls),
+        "elapsed_s": elapsed,
+        "endpoints": summarize(recorder, elapsed),
+        "stages_ms": stage_means(metrics.text) if metrics.status_code == 200 else {},
+    }
+
+
+async def _run_in_process(args: argparse.Namespace, stub_base: str) -> dict:
+    # Settings are read at import time, so configure the app before importing it.
+    workdir = Path(tempfile.mkdtemp(prefix="loadtest-"))
+    os.environ.update({
+        "DATABASE_URL": f"sqlite+aiosqlite:///{workdir / 'app.db'}",
+        "CRM_API_BASE_URL": f"{stub_base}/crm/{{phone}}",
+        "OPENAI_BASE_URL": f"{stub_base}/v1",
+        "OPENAI_API_KEY": "stub",
+        "CRM_SYNC_CHECKPOINT_PATH": str(workdir / "sync.json"),
+    })
+    from app.main import app
+
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=30.0) as client:
+            return await drive(client, args)
+    finally:
+        await app.router.shutdown()
+
+
+async def _run_remote(args: argparse.Namespace) -> dict:
+    limits = httpx.Limits(max_connections=1000, max_keepalive_connections=200)
+    async with httpx.AsyncClient(base_url=args.url, timeout=30.0, limits=limits) as client:
+        return await drive(client, args)
+
+
+def print_report(report: dict) -> None:
+    print(f"\n{report['calls']} calls in {report['elapsed_s']:.1f}s against {report['target']}")
+    print(f"{'endpoint':18s} {'reqs':>6s} {'err':>5s} {'req/s':>7s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'max ms':>8s}")
+    for endpoint, row in report["endpoints"].items():
+        print(
+            f"{endpoint:18s} {row['requests']:6d} {row['errors']:5d} {row['throughput_rps']:7.1f} "
+            f"{row['p50_ms']:8.1f} {row['p95_ms']:8.1f} {row['p99_ms']:8.1f} {row['max_ms']:8.1f}"
+        )
+    for route, stages in report["stages_ms"].items():
+        breakdown = "  ".join(f"{stage} {ms:.1f}" for stage, ms in stages.items())
+        print(f"  mean stage ms {route}: {breakdown}")
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> bool:
+    """Print deltas against `baseline`; True if nothing regressed beyond `tolerance`."""
+    ok = True
+    print(f"\nvs. baseline ({baseline.get('target')}, {baseline.get('calls')} calls):")
+    for endpoint, row in report["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(endpoint)
+        if not base:
+            continue
+        deltas = []
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            change = (row[key] - base[key]) / base[key] if base[key] else 0.0
+            deltas.append(f"{key} {base[key]:.1f} -> {row[key]:.1f} ({change:+.0%})")
+            if key in ("p95_ms", "p99_ms") and change > tolerance:
+                ok = False
+        print(f"  {endpoint}: " + ", ".join(deltas))
+    if report["config"] != baseline.get("config"):
+        print("  note: load/stub settings differ from the baseline")
+    print("  result: " + ("ok" if ok else f"REGRESSION (p95/p99 worse by more than {tolerance:.0%})"))
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="Target a running server instead of the in-process app")
+    parser.add_argument("--rate", type=float, default=20.0, help="New calls per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to keep placing calls")
+    parser.add_argument("--turns", type=int, default=2, help="/voice/handle requests per call")
+    parser.add_argument("--think", type=float, default=2.0, help="Mean seconds between turns")
+    parser.add_argument("--local-fraction", type=float, default=0.3, help="Share of callers already in the app DB")
+    parser.add_argument("--stub-port", type=int, default=0, help="Fixed port for the stubs (default: any free port)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier --save")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    stubs.add_arguments(parser)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    stub_process, stub_base = _start_stubs(args)
+    print(f"stubs on {stub_base}: CRM_API_BASE_URL={stub_base}/crm/{{phone}} OPENAI_BASE_URL={stub_base}/v1")
+    try:
+        report = asyncio.run(_run_remote(args) if args.url else _run_in_process(args, stub_base))
+        report["stubs"] = httpx.get(f"{stub_base}/stats").json()
+    finally:
+        stub_process.terminate()
+
+    print_report(report)
+    if args.save:
+        Path(args.save).write_text(json.dumps(report, indent=2))
+        print(f"\nsaved {args.save}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if not compare(report, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Startup latency: import time and time until a server is ready.
+
+    python -m benchmarks.startup_bench [--runs 5] [--workers 2]
+                                       [--save baseline.json] [--compare baseline.json]
+
+Import: `import app.main` in a fresh interpreter (median of --runs), plus the
+cumulative `-X importtime` cost of the heavy third-party packages; those
+imported lazily show as "not imported".
+
+Ready: launches `uvicorn app.main:app` (one worker, warming up in the
+background) and `python -m app.cli serve --workers N` (warming up before
+serving) against a throwaway SQLite file on a free port, and times the first
+HTTP response and the first 200 from /healthz (503 while warming up).
+
+--save writes the results as JSON. --compare prints the change against a
+saved run and exits 1 if any median regressed by more than --tolerance.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.loadtest import _free_port
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY = ("fastapi", "pydantic", "sqlalchemy", "httpx", "openai", "langdetect", "twilio")
+_IMPORTTIME = re.compile(r"^import time:\s+\d+ \|\s+(\d+) \|\s+(\S+)$")
+
+
+def _env(workdir: Path) -> dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": str(ROOT),
+        "DATABASE_URL": f"sqlite+aiosqlite:///{workdir / 'app.db'}",
+        # Configured but never called, so warm-up builds the client as in production.
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_BASE_URL": "http://127.0.0.1:9/v1",
+        "CRM_SYNC_ON_STARTUP": "false",
+    })
+    return env
+
+
+def import_seconds(env: dict[str, str], cwd: Path) -> float:
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], env=env, cwd=cwd, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def heavy_imports(env: dict[str, str], cwd: Path) -> dict[str, float | None]:
+    """Cumulative import ms of each HEAVY package when importing app.main; None if not imported."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=env, cwd=cwd, capture_output=True, text=True, check=True,
+    )
+    found: dict[str, float | None] = dict.fromkeys(HEAVY)
+    for line in out.stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match and match.group(2) in found:
+            found[match.group(2)] = int(match.group(1)) / 1000
+    return found
+
+
+def ready_seconds(command: list[str], env: dict[str, str], cwd: Path, port: int, timeout: float = 60.0) -> dict[str, float]:
+    """Seconds from launch to the first HTTP response and to /healthz 200."""
+    start = time.perf_counter()
+    process = subprocess.Popen(command, env=env, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    result: dict[str, float] = {}
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                response = httpx.get(f"http://127.0.0.1:{port}/healthz", timeout=1.0)
+            except httpx.HTTPError:
+                time.sleep(0.01)
+                continue
+            result.setdefault("first_response_s", time.perf_counter() - start)
+            if response.status_code == 200:
+                result["ready_s"] = time.perf_counter() - start
+                return result
+            time.sleep(0.01)
+        raise SystemExit(f"{' '.join(command)} not ready within {timeout:.0f}s")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def run(args: argparse.Namespace) -> dict:
+    workdir = Path(tempfile.mkdtemp(prefix="startup-bench-"))
+    env = _env(workdir)
+    # The first run creates the schema; later runs measure the usual restart.
+    imports = [import_seconds(env, workdir) for _ in range(args.runs)]
+    servers = {
+        "uvicorn": lambda port: [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        f"serve x{args.workers}": lambda port: [
+            sys.executable, "-m", "app.cli", "serve", "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(args.workers), "--log-level", "warning",
+        ],
+    }
+    ready: dict[str, dict[str, float]] = {}
+    for name, command in servers.items():
+        samples = []
+        for _ in range(args.runs):
+            port = _free_port()
+            samples.append(ready_seconds(command(port), env, workdir, port))
+        ready[name] = {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+    return {
+        "config": {"runs": args.runs, "workers": args.workers, "python": sys.version.split()[0]},
+        "import_s": statistics.median(imports),
+        "heavy_imports_ms": heavy_imports(env, workdir),
+        "ready": ready,
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"import app.main: {report['import_s'] * 1000:.0f} ms (median of {report['config']['runs']})")
+    for module, ms in report["heavy_imports_ms"].items():
+        print(f"  {module:12s} " + (f"{ms:7.1f} ms" if ms is not None else "not imported"))
+    print(f"{'server':14s} {'first response ms':>18s} {'ready ms':>9s}")
+    for name, row in report["ready"].items():
+        print(f"{name:14s} {row['first_response_s'] * 1000:18.0f} {row['ready_s'] * 1000:9.0f}")
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> bool:
+    """Print deltas against `baseline`; True if nothing regressed beyond `tolerance`."""
+    rows = [("import app.main", report["import_s"], baseline.get("import_s"))]
+    for name, row in report["ready"].items():
+        base = baseline.get("ready", {}).get(name, {})
+        rows += [(f"{name} {key}", value, base.get(key)) for key, value in row.items()]
+    ok = True
+    print("\nvs. baseline:")
+    for label, value, base in rows:
+        if not base:
+            continue
+        change = (value - base) / base
+        print(f"  {label}: {base * 1000:.0f} -> {value * 1000:.0f} ms ({change:+.0%})")
+        if change > tolerance:
+            ok = False
+    if report["config"] != baseline.get("config"):
+        print("  note: settings differ from the baseline")
+    print("  result: " + ("ok" if ok else f"REGRESSION (worse by more than {tolerance:.0%})"))
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=2, help="Workers for the `app.cli serve` run")
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier --save")
+    parser.add_argument("--tolerance", type=float, default=0.20)
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+    if args.save:
+        Path(args.save).write_text(json.dumps(report, indent=2))
+        print(f"\nsaved {args.save}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if not compare(report, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
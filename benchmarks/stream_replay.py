@@ -0,0 +1,285 @@
+"""
+Media Streams replay client for /voice/stream.
+
+    python -m benchmarks.stream_replay [--calls 5] [--turns 3] [--wav caller.wav ...]
+                                       [--barge-in] [--url http://127.0.0.1:8000]
+
+Plays Twilio's part of a call: posts /voice/incoming, follows the
+<Connect><Stream> URL in the TwiML, sends "connected" and "start", then
+streams the caller's audio in real time as 20 ms mu-law "media" frames
+(silence between utterances, as Twilio does) and echoes each "mark" once the
+reply audio before it would have finished playing. Utterances are the --wav
+files in turn (8 kHz mono 16-bit PCM) or a synthetic tone. With --barge-in
+the caller talks over every reply but the last, --barge-after seconds into
+it, and the app is expected to answer with "clear".
+
+Without --url the app runs in-process on a free port with the stub ASR and
+TTS providers and the CRM/LLM stand-ins from benchmarks.stubs. With --url
+the target must already be running with MEDIA_STREAMS_ENABLED and an
+ASR_PROVIDER/TTS_PROVIDER.
+
+Prints response latency per turn as the caller hears it: from the end of the
+utterance to the first reply frame, so it includes the recognizer's
+end-of-utterance silence (ASR_SILENCE_MS). The app's own view, from the final
+transcript, is media_stream_response_seconds in /metrics.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import struct
+import tempfile
+import time
+import uuid
+import wave
+from base64 import b64decode, b64encode
+from pathlib import Path
+
+import httpx
+import websockets
+
+from app.utils import mulaw
+from benchmarks import stubs
+from benchmarks.loadtest import _free_port, _incoming_form, _percentile, _start_stubs
+
+FRAME_SECONDS = mulaw.FRAME_BYTES / mulaw.SAMPLE_RATE
+SILENCE = bytes([mulaw.SILENCE]) * mulaw.FRAME_BYTES
+_STREAM_URL = re.compile(r'<Stream url="([^"]+)"')
+_METRIC_LINE = re.compile(r"^(media_stream_response_seconds_(?:sum|count)|media_stream_barge_ins_total|media_stream_frames_dropped_total) (\S+)$")
+
+
+def _frames(audio: bytes) -> list[bytes]:
+    audio = audio.ljust(-(-len(audio) // mulaw.FRAME_BYTES) * mulaw.FRAME_BYTES, bytes([mulaw.SILENCE]))
+    return [audio[i:i + mulaw.FRAME_BYTES] for i in range(0, len(audio), mulaw.FRAME_BYTES)]
+
+
+def load_wav(path: str) -> list[bytes]:
+    with wave.open(path, "rb") as wav:
+        if (wav.getnchannels(), wav.getsampwidth(), wav.getframerate()) != (1, 2, mulaw.SAMPLE_RATE):
+            raise SystemExit(f"{path}: need 8 kHz mono 16-bit PCM")
+        return _frames(mulaw.encode(wav.readframes(wav.getnframes())))
+
+
+def tone(seconds: float, pitch: float = 300.0) -> list[bytes]:
+    count = int(seconds * mulaw.SAMPLE_RATE)
+    pcm = struct.pack(f"<{count}h", *(int(8000 * math.sin(2 * math.pi * pitch * n / mulaw.SAMPLE_RATE)) for n in range(count)))
+    return _frames(mulaw.encode(pcm))
+
+
+class ReplayCall:
+    def __init__(self, websocket, call_sid: str, utterances: list[list[bytes]], args: argparse.Namespace) -> None:
+        self.websocket = websocket
+        self.call_sid = call_sid
+        self.stream_sid = "MZ" + uuid.uuid4().hex
+        self.utterances = utterances
+        self.args = args
+        self.latencies: list[float] = []
+        self.timeouts = 0
+        self.clears = 0
+        self._next_frame_at = 0.0
+        self._playing_until = 0.0
+        self._reply_started = asyncio.Event()
+        self._reply_played = asyncio.Event()
+        self._first_frame_at = 0.0
+        self._awaiting_clear = False  # talked over a reply; its frames don't count until "clear"
+        self._echoes: set[asyncio.Task] = set()
+
+    async def _send(self, message: dict) -> None:
+        await self.websocket.send(json.dumps(message))
+
+    async def _frame(self, payload: bytes) -> None:
+        # Real-time pacing, like a phone line.
+        delay = self._next_frame_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._next_frame_at = max(self._next_frame_at + FRAME_SECONDS, time.monotonic() - FRAME_SECONDS)
+        await self._send({
+            "event": "media",
+            "streamSid": self.stream_sid,
+            "media": {"track": "inbound", "payload": b64encode(payload).decode("ascii")},
+        })
+
+    async def _silence_until(self, event: asyncio.Event | None, seconds: float) -> bool:
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            if event is not None and event.is_set():
+                return True
+            await self._frame(SILENCE)
+        return event is not None and event.is_set()
+
+    async def _echo_mark(self, name: str, at: float) -> None:
+        await asyncio.sleep(max(0.0, at - time.monotonic()))
+        await self._send({"event": "mark", "streamSid": self.stream_sid, "mark": {"name": name}})
+        self._reply_played.set()
+
+    async def _receive(self) -> None:
+        async for raw in self.websocket:
+            message = json.loads(raw)
+            event = message.get("event")
+            now = time.monotonic()
+            if event == "media" and not self._awaiting_clear:
+                if not self._reply_started.is_set():
+                    self._first_frame_at = now
+                    self._reply_started.set()
+                played = len(b64decode(message["media"]["payload"])) / mulaw.SAMPLE_RATE
+                self._playing_until = max(self._playing_until, now) + played
+            elif event == "mark":
+                task = asyncio.create_task(self._echo_mark(message["mark"]["name"], self._playing_until))
+                self._echoes.add(task)
+                task.add_done_callback(self._echoes.discard)
+            elif event == "clear":
+                self.clears += 1
+                self._awaiting_clear = False
+                self._playing_until = now
+
+    async def run(self) -> None:
+        receiver = asyncio.create_task(self._receive())
+        await self._send({"event": "connected", "protocol": "Call", "version": "1.0.0"})
+        await self._send({
+            "event": "start",
+            "sequenceNumber": "1",
+            "streamSid": self.stream_sid,
+            "start": {
+                "streamSid": self.stream_sid,
+                "callSid": self.call_sid,
+                "tracks": ["inbound"],
+                "mediaFormat": {"encoding": "audio/x-mulaw", "sampleRate": mulaw.SAMPLE_RATE, "channels": 1},
+                "customParameters": {},
+            },
+        })
+        self._next_frame_at = time.monotonic()
+        await self._silence_until(None, 0.5)
+        try:
+            for turn in range(self.args.turns):
+                self._reply_started.clear()
+                self._reply_played.clear()
+                for frame in self.utterances[turn % len(self.utterances)]:
+                    await self._frame(frame)
+                ended = time.monotonic()
+                if not await self._silence_until(self._reply_started, self.args.timeout):
+                    self.timeouts += 1
+                    continue
+                self.latencies.append(self._first_frame_at - ended)
+                if self.args.barge_in and turn < self.args.turns - 1:
+                    await self._silence_until(None, self.args.barge_after)
+                    self._awaiting_clear = True
+                else:
+                    await self._silence_until(self._reply_played, 30.0)
+                    await self._silence_until(None, self.args.pause)
+            await self._send({"event": "stop", "streamSid": self.stream_sid, "stop": {"callSid": self.call_sid}})
+        finally:
+            receiver.cancel()
+            for task in [receiver, *self._echoes]:
+                task.cancel()
+            await asyncio.gather(receiver, *self._echoes, return_exceptions=True)
+
+
+async def _call(client: httpx.AsyncClient, caller: str, utterances: list[list[bytes]], args: argparse.Namespace) -> ReplayCall | None:
+    call_sid = "CA" + uuid.uuid4().hex
+    response = await client.post("/voice/incoming", data=_incoming_form(caller, call_sid))
+    match = _STREAM_URL.search(response.text)
+    if not match:
+        print(f"{call_sid}: no <Stream> in the TwiML (is MEDIA_STREAMS_ENABLED set?)")
+        return None
+    async with websockets.connect(match.group(1)) as websocket:
+        call = ReplayCall(websocket, call_sid, utterances, args)
+        await call.run()
+    return call
+
+
+async def drive(base_url: str, args: argparse.Namespace) -> None:
+    utterances = [load_wav(path) for path in args.wav] or [tone(args.speech_seconds)]
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as client:
+        tasks = []
+        for n in range(args.calls):
+            tasks.append(asyncio.create_task(_call(client, stubs.number(n), utterances, args)))
+            await asyncio.sleep(args.stagger)
+        calls = [call for call in await asyncio.gather(*tasks) if call]
+        metrics = (await client.get("/metrics")).text
+
+    latencies = sorted(latency for call in calls for latency in call.latencies)
+    print(f"\n{len(calls)} calls, {len(latencies)} answered turns, {sum(c.timeouts for c in calls)} unanswered, "
+          f"{sum(c.clears for c in calls)} clears")
+    if latencies:
+        print(
+            "caller-perceived response ms: "
+            f"p50 {_percentile(latencies, 50) * 1e3:.0f}  p95 {_percentile(latencies, 95) * 1e3:.0f}  "
+            f"max {latencies[-1] * 1e3:.0f}"
+        )
+    values = {}
+    for line in metrics.splitlines():
+        match = _METRIC_LINE.match(line)
+        if match:
+            values[match.group(1)] = float(match.group(2))
+    count = values.get("media_stream_response_seconds_count", 0.0)
+    if count:
+        print(f"app response ms (final transcript -> first frame): mean {values['media_stream_response_seconds_sum'] / count * 1e3:.1f}")
+    print(f"barge-ins {values.get('media_stream_barge_ins_total', 0):.0f}, "
+          f"dropped frames {values.get('media_stream_frames_dropped_total', 0):.0f}")
+
+
+async def _run_in_process(args: argparse.Namespace, stub_base: str) -> None:
+    import uvicorn
+
+    # Settings are read at import time, so configure the app before importing it.
+    workdir = Path(tempfile.mkdtemp(prefix="stream-replay-"))
+    os.environ.update({
+        "DATABASE_URL": f"sqlite+aiosqlite:///{workdir / 'app.db'}",
+        "CRM_API_BASE_URL": f"{stub_base}/crm/{{phone}}",
+        "OPENAI_BASE_URL": f"{stub_base}/v1",
+        "OPENAI_API_KEY": "stub",
+        "CRM_SYNC_CHECKPOINT_PATH": str(workdir / "sync.json"),
+        "TTS_PROVIDER": "stub",
+        "TTS_CACHE_DIR": str(workdir / "tts"),
+        "ASR_PROVIDER": "stub",
+        "MEDIA_STREAMS_ENABLED": "true",
+    })
+    from app.main import app
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        if serving.done():
+            serving.result()
+        await asyncio.sleep(0.05)
+    try:
+        await drive(f"http://127.0.0.1:{port}", args)
+    finally:
+        server.should_exit = True
+        await serving
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="Target a running server instead of the in-process app")
+    parser.add_argument("--calls", type=int, default=5, help="Concurrent calls")
+    parser.add_argument("--stagger", type=float, default=0.2, help="Seconds between call starts")
+    parser.add_argument("--turns", type=int, default=3, help="Utterances per call")
+    parser.add_argument("--wav", action="append", default=[], help="Caller utterance (8 kHz mono 16-bit WAV); repeatable")
+    parser.add_argument("--speech-seconds", type=float, default=1.2, help="Length of the synthetic utterance")
+    parser.add_argument("--pause", type=float, default=0.3, help="Silence after a reply finishes playing")
+    parser.add_argument("--barge-in", action="store_true", help="Talk over every reply but the last")
+    parser.add_argument("--barge-after", type=float, default=0.3, help="Seconds into a reply to barge in")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Seconds to wait for a reply to start")
+    parser.add_argument("--stub-port", type=int, default=0, help="Fixed port for the stubs (default: any free port)")
+    stubs.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.url:
+        asyncio.run(drive(args.url, args))
+        return
+    stub_process, stub_base = _start_stubs(args)
+    try:
+        asyncio.run(_run_in_process(args, stub_base))
+    finally:
+        stub_process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Local stand-ins for the CRM and an OpenAI-compatible chat endpoint.
+
+    python -m benchmarks.stubs [--port 8900] [--population 10000] [--crm-fraction 0.6]
+                               [--crm-latency 0.08] [--crm-error-rate 0.01]
+                               [--llm-latency 0.6] [--llm-error-rate 0.01]
+
+Point the app at it with
+    CRM_API_BASE_URL=http://127.0.0.1:8900/crm/{phone}
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 OPENAI_API_KEY=stub
+
+Phone numbers of the synthetic population are `number(i)`; the CRM knows the
+first `crm_fraction` of them and answers 404 for the rest.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+LANGUAGES = ("en-US", "hi-IN", "mr-IN")
+GENDERS = ("female", "male")
+_PREFIX = "+1555"
+
+
+def number(i: int) -> str:
+    return f"{_PREFIX}{i:07d}"
+
+
+def index_of(phone: str) -> int | None:
+    rest = phone[len(_PREFIX):]
+    if not phone.startswith(_PREFIX) or not rest.isdigit():
+        return None
+    return int(rest)
+
+
+def profile(i: int) -> dict[str, str]:
+    return {
+        "phone_number": number(i),
+        "name": f"Caller {i}",
+        "gender": GENDERS[i % len(GENDERS)],
+        "language_code": LANGUAGES[i % len(LANGUAGES)],
+    }
+
+
+def _jitter(latency: float) -> float:
+    # Roughly log-normal around `latency`, like real upstream latency.
+    return latency * random.lognormvariate(0, 0.35) if latency > 0 else 0.0
+
+
+def build_app(
+    population: int,
+    crm_fraction: float,
+    crm_latency: float,
+    crm_error_rate: float,
+    llm_latency: float,
+    llm_error_rate: float,
+):
+    app = FastAPI()
+    known = int(population * crm_fraction)
+    counts = {"crm": 0, "crm_errors": 0, "llm": 0, "llm_errors": 0}
+
+    @app.get("/crm/{phone}")
+    async def crm(phone: str):
+        counts["crm"] += 1
+        await asyncio.sleep(_jitter(crm_latency))
+        if random.random() < crm_error_rate:
+            counts["crm_errors"] += 1
+            return Response(status_code=503)
+        i = index_of(phone)
+        if i is None or i >= known:
+            return Response(status_code=404)
+        return profile(i)
+
+    @app.post("/v1/chat/completions")
+    async def chat(request: Request):
+        counts["llm"] += 1
+        body = await request.json()
+        if random.random() < llm_error_rate:
+            counts["llm_errors"] += 1
+            return JSONResponse({"error": {"message": "stub failure", "type": "server_error"}}, status_code=500)
+
+        words = "Thanks for calling. I have noted your request and will help you with it right away.".split()
+        total = _jitter(llm_latency)
+        created = int(time.time())
+        base = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": created, "model": body.get("model", "stub")}
+
+        if not body.get("stream"):
+            await asyncio.sleep(total)
+            return {
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": " ".join(words)}}],
+            }
+
+        async def events():
+            # A third of the latency before the first token, the rest spread over the tokens.
+            await asyncio.sleep(total / 3)
+            for n, word in enumerate(words):
+                delta = {"content": (" " if n else "") + word}
+                yield f"data: {json.dumps({**base, 'choices': [{'index': 0, 'delta': delta, 'finish_reason': None}]})}\n\n"
+                await asyncio.sleep(total * 2 / 3 / len(words))
+            yield f"data: {json.dumps({**base, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def stats():
+        return counts
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--population", type=int, default=10000, help="Synthetic callers")
+    parser.add_argument("--crm-fraction", type=float, default=0.6, help="Share of callers the CRM knows")
+    parser.add_argument("--crm-latency", type=float, default=0.08, help="Median CRM latency (s)")
+    parser.add_argument("--crm-error-rate", type=float, default=0.01)
+    parser.add_argument("--llm-latency", type=float, default=0.6, help="Median full-reply LLM latency (s)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.01)
+
+
+def serve(port: int, args: argparse.Namespace) -> None:
+    import uvicorn
+
+    app = build_app(
+        args.population,
+        args.crm_fraction,
+        args.crm_latency,
+        args.crm_error_rate,
+        args.llm_latency,
+        args.llm_error_rate,
+    )
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8900)
+    add_arguments(parser)
+    args = parser.parse_args()
+    serve(args.port, args)
+
+
+if __name__ == "__main__":
+    main()
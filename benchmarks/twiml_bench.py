@@ -0,0 +1,63 @@
+"""
+Microbenchmark: precompiled TwiML responses vs. per-request rendering.
+
+    python -m benchmarks.twiml_bench [-n 100000]
+
+"legacy" renders per request with `say_twiml`/`gather_speech_twiml`; the
+escape cases compare the chained str.replace escaper with single-pass ones.
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import timeit
+
+from app.utils import twiml
+
+PROMPT = "स्वागत है। बीप के बाद अपना प्रश्न बोलें।"
+REPLY = 'Your balance is <b>"1,200"</b> & your plan renews on Friday. Anything else?'
+
+
+_TABLE = {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&apos;"}
+_TRANSLATE = str.maketrans(_TABLE)
+_SPECIAL = re.compile("[&<>\"']")
+
+
+def translate_escape(text: str) -> str:
+    return text.translate(_TRANSLATE)
+
+
+def regex_escape(text: str) -> str:
+    return _SPECIAL.sub(lambda m: _TABLE[m.group()], text)
+
+
+CASES = {
+    "escape: chained replace": lambda: twiml.escape(REPLY),
+    "escape: str.translate": lambda: translate_escape(REPLY),
+    "escape: regex": lambda: regex_escape(REPLY),
+    "gather: legacy + xml_response": lambda: twiml.xml_response(
+        twiml.gather_speech_twiml(PROMPT, "/voice/handle", "hi-IN", "Polly.Aditi")
+    ),
+    "gather: gather_response (cached)": lambda: twiml.gather_response(
+        PROMPT, "/voice/handle", "hi-IN", "Polly.Aditi"
+    ),
+    "say: legacy + xml_response": lambda: twiml.xml_response(twiml.say_twiml(REPLY, "en-US", "alice")),
+    "say: say_response": lambda: twiml.say_response(REPLY, "en-US", "alice"),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--number", type=int, default=100_000)
+    args = parser.parse_args()
+
+    assert translate_escape(REPLY) == regex_escape(REPLY) == twiml.escape(REPLY)
+
+    for name, fn in CASES.items():
+        best = min(timeit.repeat(fn, number=args.number, repeat=5))
+        print(f"{name:36s} {best / args.number * 1e6:8.3f} us/op")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db import Base, build_engine
+from app.services import profiles
+
+
+@pytest.fixture
+def run_db(tmp_path):
+    """Run `fn(session)` against a fresh SQLite database with the app's schema."""
+    profiles.profile_cache.clear()
+
+    async def run(fn, schema=True):
+        engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+        try:
+            if schema:
+                async with engine.begin() as conn:
+                    await conn.run_sync(Base.metadata.create_all)
+            async with async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)() as db:
+                return await fn(db)
+        finally:
+            await engine.dispose()
+
+    yield lambda fn, schema=True: asyncio.run(run(fn, schema))
+    profiles.profile_cache.clear()
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from app.services import bulk
+
+
+async def _chunks(data: bytes, size: int = 7):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+@pytest.fixture
+def upserted(monkeypatch):
+    rows = []
+
+    async def bulk_upsert(db, batch):
+        rows.extend(batch)
+        return len(batch)
+
+    monkeypatch.setattr(bulk.svc, "bulk_upsert", bulk_upsert)
+    return rows
+
+
+def _import(data: bytes, fmt: str = "csv") -> dict:
+    return asyncio.run(bulk.import_profiles(None, _chunks(data), fmt))
+
+
+def test_csv_quoted_field_may_span_lines(upserted):
+    data = b'name,phone_number,gender,language_code\r\n"Asha\nK",9812345680,female,en-US\r\nRavi,9812345681,male,\r\n'
+    result = _import(data)
+    assert result["error_count"] == 0
+    assert [row["name"] for row in upserted] == ["Asha\nK", "Ravi"]
+
+
+def test_csv_newline_inside_quoted_phone_is_reported(upserted):
+    data = b'name,phone_number,gender,language_code\nA,9812345679,male,en-US\nB,"98123,\n45680",female,en-US\nC,9812345681,female,en-US\n'
+    result = _import(data)
+    assert result["upserted"] == 2
+    assert [row["name"] for row in upserted] == ["A", "C"]
+    assert result["error_count"] == 1
+    assert result["errors"] == [{"line": 3, "error": "phone_number: contains a line break"}]
+
+
+def test_csv_row_with_missing_columns_is_an_error(upserted):
+    data = b"name,phone_number,gender,language_code\nA,9812345679\n"
+    result = _import(data)
+    assert upserted == []
+    assert result["errors"] == [{"line": 2, "error": "invalid CSV: expected 4 columns, got 2"}]
+
+
+def test_csv_unterminated_quote_is_an_error(upserted):
+    data = b'name,phone_number\nA,9812345679\n"B,9812345680\n'
+    result = _import(data)
+    assert len(upserted) == 1
+    assert result["errors"] == [{"line": 3, "error": "invalid CSV: unterminated quoted field"}]
@@ -0,0 +1,37 @@
+import asyncio
+import time
+
+import httpx
+
+from app.services import crm
+from app.utils.admission import Shed
+
+
+def _half_open(monkeypatch) -> crm.CircuitBreaker:
+    breaker = crm.CircuitBreaker(threshold=1, cooldown=30.0)
+    breaker.record_failure()
+    breaker.opened_at = time.monotonic() - 31.0
+    assert breaker.state == "half_open"
+    monkeypatch.setattr(crm, "breaker", breaker)
+    monkeypatch.setattr(crm.settings, "crm_api_base_url", "http://crm.test/{phone}")
+    crm.negative_cache.clear()
+    return breaker
+
+
+def test_shed_half_open_trial_lets_the_next_lookup_try(monkeypatch):
+    breaker = _half_open(monkeypatch)
+
+    async def shed(*args, **kwargs):
+        raise Shed("crm")
+
+    monkeypatch.setattr(crm, "_get", shed)
+    assert asyncio.run(crm.fetch_profile("+14155550100")) is None
+    assert breaker.state == "half_open"
+
+    async def ok(url, *args, **kwargs):
+        return httpx.Response(200, json={"phone_number": "+14155550100", "name": "Asha"})
+
+    monkeypatch.setattr(crm, "_get", ok)
+    profile = asyncio.run(crm.fetch_profile("+14155550100"))
+    assert profile is not None and profile.name == "Asha"
+    assert breaker.state == "closed"
@@ -0,0 +1,69 @@
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+from app.migrations import backfill_phone_e164
+
+# customers as created before phone_e164 existed.
+LEGACY_SCHEMA = """
+CREATE TABLE customers (
+    id INTEGER NOT NULL,
+    phone_number VARCHAR(32) NOT NULL,
+    name VARCHAR(128),
+    gender VARCHAR(16) NOT NULL,
+    language_code VARCHAR(16) NOT NULL,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL,
+    PRIMARY KEY (id)
+)
+"""
+
+ROWS = [
+    (1, "(415) 555-1234", datetime(2023, 1, 1)),
+    (2, "+1 415-555-1234", datetime(2024, 6, 1)),  # newest of the three: keeps the key
+    (3, "4155551234", datetime(2022, 3, 1)),
+    (4, "+91 98123 45678", datetime(2021, 1, 1)),
+    (5, "unknown", datetime(2021, 1, 1)),
+]
+
+
+def _legacy_db(run_db, batch_size):
+    async def migrate(db):
+        conn = await db.connection()
+        await conn.execute(text(LEGACY_SCHEMA))
+        for row_id, phone, updated_at in ROWS:
+            await conn.execute(
+                text(
+                    "INSERT INTO customers VALUES "
+                    "(:id, :phone, NULL, 'neutral', 'en-US', :updated_at, :updated_at)"
+                ),
+                {"id": row_id, "phone": phone, "updated_at": updated_at},
+            )
+        first = await conn.run_sync(backfill_phone_e164, batch_size)
+        second = await conn.run_sync(backfill_phone_e164, batch_size)
+        keys = dict((await conn.execute(text("SELECT id, phone_e164 FROM customers"))).all())
+        stamps = dict((await conn.execute(text("SELECT id, updated_at FROM customers"))).all())
+        indexes = await conn.run_sync(lambda sync: [ix["name"] for ix in inspect(sync).get_indexes("customers")])
+        await db.commit()
+        return first, second, keys, stamps, indexes
+
+    return run_db(migrate, schema=False)
+
+
+def test_backfill_keys_newest_duplicate_and_reports_the_rest(run_db):
+    first, second, keys, stamps, indexes = _legacy_db(run_db, batch_size=1000)
+    assert keys == {1: None, 2: "+14155551234", 3: None, 4: "+919812345678", 5: "unknown"}
+    assert first.keyed == 3
+    assert sorted(first.duplicates) == [("+14155551234", 2, 1), ("+14155551234", 2, 3)]
+    assert "ix_customers_phone_e164" in indexes
+    # Keying rows isn't an edit.
+    assert stamps[2].startswith("2024-06-01")
+    # Idempotent: nothing new is keyed and the same losers are reported again.
+    assert second.keyed == 0
+    assert sorted(second.duplicates) == sorted(first.duplicates)
+
+
+def test_backfill_moves_the_key_when_a_newer_duplicate_is_in_a_later_batch(run_db):
+    first, _, keys, _, _ = _legacy_db(run_db, batch_size=1)
+    assert keys[2] == "+14155551234" and keys[1] is None and keys[3] is None
+    assert sorted(first.duplicates) == [("+14155551234", 2, 1), ("+14155551234", 2, 3)]
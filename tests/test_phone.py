@@ -0,0 +1,42 @@
+import pytest
+
+from app.utils.phone import to_e164
+
+
+@pytest.mark.parametrize(
+    ("raw", "region", "expected"),
+    [
+        ("(415) 555-1234", "US", "+14155551234"),
+        ("1-415-555-1234", "US", "+14155551234"),  # trunk prefix
+        ("+1 415 555 1234", "IN", "+14155551234"),  # country code wins over region
+        ("098123 45678", "IN", "+919812345678"),  # trunk prefix
+        ("91 98123 45678", "IN", "+919812345678"),  # calling code without +
+        ("07700 900123", "GB", "+447700900123"),
+        ("0412 345 678", "AU", "+61412345678"),
+        ("0044 7700 900123", "US", "+447700900123"),  # 00 international prefix
+        ("00 91 98123 45678", "US", "+919812345678"),
+    ],
+)
+def test_numbers_are_canonicalized(raw, region, expected):
+    assert to_e164(raw, region) == expected
+
+
+@pytest.mark.parametrize(
+    ("raw", "expected"),
+    [
+        ("", ""),
+        ("  unknown ", "unknown"),
+        ("sip:agent@example.com", "sip:agent@example.com"),
+        ("client:alice", "client:alice"),
+        ("12345", "12345"),  # too short for the region
+        ("+123", "+123"),  # too short for E.164
+        ("+1234567890123456", "+1234567890123456"),  # too long for E.164
+        ("00123", "00123"),
+    ],
+)
+def test_non_phone_input_is_returned_unchanged(raw, expected):
+    assert to_e164(raw, "US") == expected
+
+
+def test_unknown_region_keeps_national_numbers_as_given():
+    assert to_e164("4155551234", "FR") == "4155551234"
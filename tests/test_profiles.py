@@ -0,0 +1,85 @@
+from sqlalchemy import func, select
+
+from app.models import Customer
+from app.services import profiles
+from app.services.crm import CRMProfile
+
+
+async def _seed(db):
+    return await profiles.bulk_upsert(
+        db,
+        [{"phone_number": "(415) 555-1234", "name": "Asha", "gender": "female", "language_code": "hi-IN"}],
+    )
+
+
+async def _row(db, phone="+14155551234"):
+    db.expire_all()
+    return (await db.execute(select(Customer).where(Customer.phone_e164 == phone))).scalar_one()
+
+
+def test_new_row_stores_the_canonical_number(run_db):
+    async def check(db):
+        await _seed(db)
+        return await _row(db)
+
+    row = run_db(check)
+    assert (row.phone_number, row.phone_e164, row.name) == ("+14155551234", "+14155551234", "Asha")
+
+
+def test_bulk_upsert_overwrites_only_the_columns_given(run_db):
+    async def check(db):
+        await _seed(db)
+        await profiles.bulk_upsert(db, [{"phone_number": "415-555-1234", "language_code": "en-US"}])
+        count = (await db.execute(select(func.count()).select_from(Customer))).scalar_one()
+        return count, await _row(db)
+
+    count, row = run_db(check)
+    assert count == 1
+    assert (row.name, row.gender, row.language_code) == ("Asha", "female", "en-US")
+
+
+def test_crm_upsert_keeps_name_and_gender_it_does_not_supply(run_db):
+    async def check(db):
+        await _seed(db)
+        partial = CRMProfile(phone_number="+1 415 555 1234", language_code="mr_IN")
+        obj = await profiles.upsert_from_crm(db, partial, "en-US", "neutral")
+        kept = (obj.id, obj.name, obj.gender, obj.language_code)
+        full = CRMProfile(phone_number="4155551234", name="Asha K", gender="Neutral")
+        obj = await profiles.upsert_from_crm(db, full, "en-US", "neutral")
+        return kept, (obj.id, obj.name, obj.gender, obj.language_code)
+
+    kept, replaced = run_db(check)
+    assert kept[1:] == ("Asha", "female", "mr-IN")
+    # A CRM profile without a language falls back to the default, which is always written.
+    assert replaced[1:] == ("Asha K", "neutral", "en-US")
+    assert kept[0] == replaced[0]
+
+
+def test_conflict_without_update_columns_returns_the_existing_row(run_db):
+    async def check(db):
+        await _seed(db)
+        row = await _row(db)
+        before = (row.id, row.updated_at)
+        obj = await profiles._upsert_one(
+            db,
+            {"phone_number": "+14155551234", "gender": "neutral", "language_code": "en-US"},
+            update_columns=(),
+        )
+        return before, obj, await _row(db)
+
+    before, obj, after = run_db(check)
+    assert obj.id == before[0]
+    assert (obj.name, obj.gender, obj.language_code) == ("Asha", "female", "hi-IN")
+    assert after.updated_at == before[1]
+
+
+def test_get_or_create_default_creates_once(run_db):
+    async def check(db):
+        first = await profiles.get_or_create_default(db, "415 555 0000", "en-US", "neutral")
+        profiles.profile_cache.clear()
+        second = await profiles.get_or_create_default(db, "+14155550000", "hi-IN", "neutral")
+        return first, second
+
+    first, second = run_db(check)
+    assert first.id == second.id
+    assert second.language_code == "en-US"
@@ -0,0 +1,11 @@
+import asyncio
+
+from app.services.reply_cache import ReplyCache
+
+
+def test_short_name_inside_another_word_is_kept():
+    cache = ReplyCache()
+    cache.persistent = None
+    asyncio.run(cache.set("is my balance ok", "en-US", "Al", "Also, Al, your balance is fine."))
+    reply = asyncio.run(cache.get("is my balance ok", "en-US", "Ravi"))
+    assert reply == "Also, Ravi, your balance is fine."
@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from app.services import speculation
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Stands in for nlp.speculate: records utterances and marks the LLM as called."""
+    calls = []
+
+    async def speculate(utterance, language_code, name=None, history=(), on_llm_call=None):
+        calls.append(utterance)
+        if on_llm_call is not None:
+            on_llm_call()
+        await asyncio.sleep(0.01)
+        return f"reply to {utterance}"
+
+    monkeypatch.setattr(speculation.nlp, "speculate", speculate)
+    monkeypatch.setattr(speculation.settings, "speculation_stable_ms", 20)
+    speculation._calls.clear()
+    return calls
+
+
+def _counts():
+    return {
+        outcome: speculation.SPECULATIONS.value(outcome)
+        for outcome in ("hit", "miss", "superseded", "expired")
+    } | {"wasted": speculation.WASTED_LLM_CALLS.value()}
+
+
+def _delta(before):
+    after = _counts()
+    return {key: after[key] - before[key] for key in after if after[key] != before[key]}
+
+
+def test_fully_stable_partial_is_used_by_take(llm):
+    async def call():
+        before = _counts()
+        speculation.partial("CA1", 1, "What is my balance?", "", "en-US", "Asha")
+        assert speculation._calls["CA1"].speculation is not None  # no debounce when nothing is unstable
+        reply = await speculation.take("CA1", "what is my balance", "en-US", "Asha")
+        return reply, before
+
+    reply, before = asyncio.run(call())
+    assert reply == "reply to What is my balance?"
+    assert llm == ["What is my balance?"]
+    assert _delta(before) == {"hit": 1}
+    assert "CA1" not in speculation._calls
+
+
+def test_unstable_partial_waits_for_the_stable_time(llm):
+    async def call():
+        speculation.partial("CA2", 1, "What is", "my balance", "en-US", None)
+        assert speculation._calls["CA2"].speculation is None
+        await asyncio.sleep(0.05)
+        assert speculation._calls["CA2"].speculation is not None
+        return await speculation.take("CA2", "What is my balance", "en-US", None)
+
+    assert asyncio.run(call()) == "reply to What is my balance"
+
+
+def test_out_of_order_partials_are_ignored(llm):
+    async def call():
+        speculation.partial("CA3", 2, "What is my balance", "", "en-US", None)
+        speculation.partial("CA3", 1, "What is", "", "en-US", None)
+        return await speculation.take("CA3", "What is my balance", "en-US", None)
+
+    assert asyncio.run(call()) == "reply to What is my balance"
+    assert llm == ["What is my balance"]
+
+
+def test_changed_transcript_supersedes_and_counts_the_wasted_call(llm):
+    async def call():
+        before = _counts()
+        speculation.partial("CA4", 1, "What is my", "", "en-US", None)
+        await asyncio.sleep(0)  # the first speculation reaches the LLM
+        speculation.partial("CA4", 2, "What is my plan", "", "en-US", None)
+        reply = await speculation.take("CA4", "What is my plan", "en-US", None)
+        return reply, before
+
+    reply, before = asyncio.run(call())
+    assert reply == "reply to What is my plan"
+    assert _delta(before) == {"superseded": 1, "wasted": 1, "hit": 1}
+
+
+def test_different_final_transcript_is_a_miss(llm):
+    async def call():
+        before = _counts()
+        speculation.partial("CA5", 1, "What is my balance", "", "en-US", None)
+        await asyncio.sleep(0)
+        reply = await speculation.take("CA5", "What is my plan", "en-US", None)
+        return reply, before
+
+    reply, before = asyncio.run(call())
+    assert reply is None
+    assert _delta(before) == {"miss": 1, "wasted": 1}
+
+
+def test_language_or_name_change_is_a_miss(llm):
+    async def call():
+        speculation.partial("CA6", 1, "balance", "", "en-US", "Asha")
+        return await speculation.take("CA6", "balance", "en-US", "Ravi")
+
+    assert asyncio.run(call()) is None
+
+
+def test_speculation_never_taken_expires(llm, monkeypatch):
+    monkeypatch.setattr(speculation, "_KEEP_SECONDS", 0.03)
+
+    async def call():
+        before = _counts()
+        speculation.partial("CA7", 1, "What is my balance", "", "en-US", None)
+        await asyncio.sleep(0.1)
+        return before
+
+    before = asyncio.run(call())
+    assert "CA7" not in speculation._calls
+    assert _delta(before) == {"expired": 1, "wasted": 1}
+
+
+def test_take_without_partials_returns_none(llm):
+    assert asyncio.run(speculation.take("CA8", "hello", "en-US", None)) is None